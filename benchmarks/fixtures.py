@@ -0,0 +1,73 @@
+import json
+
+import flatbuffers
+import numpy as np
+import pandas as pd
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+# Synthetic Open-Meteo payloads, so the pipeline can be timed without the network.
+# The hourly fixture is a real FlatBuffers WeatherApiResponse built field by field
+# (hourly is field 11 of the response; VariablesWithTime holds time, time_end,
+# interval and the variables vector; VariableWithValues holds variable and values).
+START = pd.Timestamp("2000-01-01", tz="UTC")
+SIZES = {"1w": 7, "1y": 365, "20y": 20 * 365 + 5}
+
+def _series(rng, n, period, name):
+    if name == "weather_code":
+        return rng.choice([0, 1, 2, 3, 45, 61, 63, 80], n).astype(np.float32)
+    phase = 2 * np.pi * np.arange(n) / period
+    return (10 + 8 * np.sin(phase) + rng.normal(0, 2, n)).astype(np.float32)
+
+def hourly_bytes(days, variables, start=START, seed=0):
+    # One serialized WeatherApiResponse (without the 4-byte length prefix used on the wire)
+    n_hours = days * 24
+    rng = np.random.default_rng(seed)
+    builder = flatbuffers.Builder(1024 + n_hours * len(variables) * 4)
+
+    variable_offsets = []
+    for i, name in enumerate(variables):
+        values = builder.CreateNumpyVector(_series(rng, n_hours, 24 * 365.25, name))
+        builder.StartObject(16)
+        builder.PrependUint8Slot(0, i + 1, 0)
+        builder.PrependUOffsetTRelativeSlot(3, values, 0)
+        variable_offsets.append(builder.EndObject())
+
+    builder.StartVector(4, len(variable_offsets), 4)
+    for offset in reversed(variable_offsets):
+        builder.PrependUOffsetTRelative(offset)
+    variables_vector = builder.EndVector()
+
+    start = int(pd.Timestamp(start).timestamp())
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, start, 0)
+    builder.PrependInt64Slot(1, start + n_hours * 3600, 0)
+    builder.PrependInt32Slot(2, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variables_vector, 0)
+    hourly = builder.EndObject()
+
+    builder.StartObject(16)
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+    builder.Finish(builder.EndObject())
+    return bytes(builder.Output())
+
+def hourly_response(days, variables, start=START, seed=0):
+    return WeatherApiResponse.GetRootAs(hourly_bytes(days, variables, start, seed), 0)
+
+def daily_payload(days, variables, start=START, seed=0):
+    # Body of an archive ?daily= response, as the JSON text the API sends
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(pd.Timestamp(start).tz_localize(None), periods=days, freq="D")
+    daily = {"time": times.strftime("%Y-%m-%d").tolist()}
+    for name in variables:
+        daily[name] = np.round(_series(rng, days, 365.25, name), 1).tolist()
+    return json.dumps({"latitude": 51.5, "longitude": -0.1, "daily": daily})
+
+class FakeResponse:
+    # Stands in for a requests.Response carrying a fixture body
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
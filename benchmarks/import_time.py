@@ -0,0 +1,63 @@
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cold-start scenarios, each run in a fresh interpreter, with a budget in milliseconds.
+# Budgets cover the imports the app does before rendering anything; plotly, the Open-Meteo
+# client and requests_cache are loaded lazily and should not show up here.
+SCENARIOS = {
+    "functions": ("import functions", 150),
+    "daily_page": ("import streamlit, pandas\n"
+                   "from functions import get_archive_daily_weather, plot_chart, FrameCache, compute_rollups, "
+                   "downsample, fit_trends, lazy_import", 1500),
+    "hourly_page": ("import streamlit, pandas\n"
+                    "from functions import get_openmeteo_client, add_hourly_columns_weather, FrameCache, "
+                    "compute_rollups, downsample, fit_trends, lazy_import", 1500),
+}
+HEAVY_MODULES = ["plotly.express", "openmeteo_requests", "requests_cache", "scipy", "statsmodels", "matplotlib"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def run_scenario(code, repeat):
+    timings = []
+    heavy = ""
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        elapsed, _, heavy = result.stdout.strip().partition(" ")
+        timings.append(float(elapsed) * 1000)
+    return min(timings), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time of the app's entry points.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per scenario (best is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply budgets, e.g. for slow CI machines")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, (code, budget) in SCENARIOS.items():
+        elapsed, heavy = run_scenario(code, args.repeat)
+        limit = budget * args.scale
+        status = "ok" if elapsed <= limit and not heavy else "FAIL"
+        failed = failed or status == "FAIL"
+        line = f"{name:<12} {elapsed:8.1f} ms  (budget {limit:.0f} ms)  {status}"
+        if heavy:
+            line += f"  eagerly imported: {heavy}"
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit, urlencode
+
+import pandas as pd
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import daily_payload, hourly_bytes
+from utils.config import UPSTREAMS
+
+# Stand-in for the Open-Meteo, Nominatim and postcodes.io endpoints, e.g.
+#   python benchmarks/mock_server.py --mode record              # proxy and save real responses
+#   python benchmarks/mock_server.py --latency-ms 150 --error-rate 0.05
+#   MOCK_SERVER_URL=http://127.0.0.1:8080 streamlit run main.py
+# Every service is served under /<service>/..., matching utils.config.base_url.
+DEFAULT_RECORDINGS = Path(__file__).resolve().parent / "recordings"
+USER_AGENT = "weather-archive-app/1.0 (mock recorder)"
+
+def _query(raw_query):
+    # Sorted (key, value) pairs; list values sent as "a,b" or repeated keys count as the same request
+    pairs = []
+    for key, value in parse_qsl(raw_query, keep_blank_values=True):
+        pairs.extend((key, part) for part in value.split(","))
+    return sorted(pairs)
+
+def recording_key(service, path, query):
+    text = f"{service} {path}?{urlencode(query)}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def _weather_response(path, query):
+    params = {}
+    for key, value in query:
+        params.setdefault(key, []).append(value)
+    today = date.today()
+    start = pd.Timestamp(params.get("start_date", [str(today)])[0], tz="UTC")
+    end = pd.Timestamp(params.get("end_date", [str(today + timedelta(days=6))])[0], tz="UTC")
+    days = max((end - start).days + 1, 1)
+    seed = int(recording_key("weather", path, query)[:8], 16)
+
+    if params.get("format") == ["flatbuffers"]:
+        message = hourly_bytes(days, params.get("hourly", []), start=start, seed=seed)
+        return 200, "application/octet-stream", len(message).to_bytes(4, "little") + message
+    body = daily_payload(days, params.get("daily", []), start=start, seed=seed)
+    return 200, "application/json", body.encode()
+
+def synthetic_response(service, path, query):
+    # Plausible, deterministic answers for requests that were never recorded
+    params = dict(query)
+    if service in ("archive", "forecast"):
+        return _weather_response(path, query)
+    if service == "geocoding":
+        body = {"results": [{"name": params.get("name", "Mock City"), "latitude": 51.5, "longitude": -0.12}]}
+    elif service == "nominatim" and path == "/reverse":
+        body = {"display_name": f"Mock place near {params.get('lat')}, {params.get('lon')}"}
+    elif service == "nominatim":
+        name = params.get("q", "mock").title()
+        body = [{"display_name": f"{name}, Mock Region {i}", "lat": str(51.5 + i), "lon": str(-0.12 + i),
+                 "importance": 0.5 - i / 10} for i in range(3)]
+    elif service == "postcodes":
+        body = {"status": 200, "result": {"postcode": path.rsplit("/", 1)[-1], "latitude": 51.5, "longitude": -0.12}}
+    else:
+        return None
+    return 200, "application/json", json.dumps(body).encode()
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, mode="synthetic", recordings=DEFAULT_RECORDINGS, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, error_status=503, seed=0):
+        super().__init__(address, MockHandler)
+        self.mode = mode
+        self.recordings = Path(recordings)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def count(self, service, outcome):
+        with self.lock:
+            service_stats = self.stats.setdefault(service, {})
+            service_stats[outcome] = service_stats.get(outcome, 0) + 1
+
+    def load(self, service, key):
+        meta_path = self.recordings / service / f"{key}.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        return meta["status"], meta["content_type"], (self.recordings / service / f"{key}.body").read_bytes()
+
+    def save(self, service, key, url, status, content_type, body):
+        directory = self.recordings / service
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{key}.body").write_bytes(body)
+        meta = {"url": url, "status": status, "content_type": content_type}
+        (directory / f"{key}.json").write_text(json.dumps(meta, indent=2))
+
+    def fetch_upstream(self, service, path, raw_query):
+        url = f"{UPSTREAMS[service]}{path}" + (f"?{raw_query}" if raw_query else "")
+        res = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=60)
+        return url, res.status_code, res.headers.get("Content-Type", "application/octet-stream"), res.content
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        if parts.path == "/__stats":
+            with server.lock:
+                return self._send(200, "application/json", json.dumps(server.stats).encode())
+
+        service, _, rest = parts.path.lstrip("/").partition("/")
+        path = f"/{rest}"
+        if service not in UPSTREAMS:
+            return self._send(404, "application/json", b'{"error": true, "reason": "Unknown service"}')
+
+        delay = server.latency_ms + server.random.uniform(0, server.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if server.random.random() < server.error_rate:
+            server.count(service, "injected_error")
+            body = json.dumps({"error": True, "reason": "Injected error"}).encode()
+            return self._send(server.error_status, "application/json", body)
+
+        query = _query(parts.query)
+        key = recording_key(service, path, query)
+        recorded = server.load(service, key)
+        if recorded is not None:
+            server.count(service, "replayed")
+            return self._send(*recorded)
+
+        if server.mode == "record":
+            url, status, content_type, body = server.fetch_upstream(service, path, parts.query)
+            if status == 200:
+                server.save(service, key, url, status, content_type, body)
+            server.count(service, "recorded" if status == 200 else "upstream_error")
+            return self._send(status, content_type, body)
+
+        response = synthetic_response(service, path, query) if server.mode == "synthetic" else None
+        if response is None:
+            server.count(service, "missing")
+            return self._send(404, "application/json", b'{"error": true, "reason": "No recording"}')
+        server.count(service, "synthetic")
+        return self._send(*response)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic Open-Meteo style responses locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mode", choices=["synthetic", "replay", "record"], default="synthetic",
+                        help="synthetic: recordings, else generated data; replay: recordings only; "
+                             "record: recordings, else fetch upstream and save")
+    parser.add_argument("--recordings", default=str(DEFAULT_RECORDINGS), help="Directory of recorded responses")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random latency, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = MockServer((args.host, args.port), args.mode, args.recordings, args.latency_ms, args.jitter_ms,
+                        args.error_rate, args.error_status, args.seed)
+    print(f"Mock server ({args.mode}) on http://{args.host}:{server.server_port}; "
+          f"set MOCK_SERVER_URL=http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import SIZES, FakeResponse, daily_payload, hourly_response
+from utils import data_fetching
+from utils.data_fetching import DAILY_VARIABLES, HOURLY_VARIABLES
+from utils.parsing import parse_hourly_response
+from utils.plotting import plot_chart
+from utils.rollups import compute_rollups, DAILY_ROLLUPS, HOURLY_ROLLUPS
+from utils.trends import fit_trends
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# A stage is slower or hungrier than its baseline by more than this fraction -> regression
+DEFAULT_TOLERANCE = 0.25
+
+# Timings below this are dominated by noise and only flagged past an absolute margin
+MIN_SECONDS = 0.005
+
+def _daily_frame(payload):
+    # The real _fetch_archive_daily, with the HTTP call answered from the fixture
+    original = data_fetching.http_get
+    data_fetching.http_get = lambda url, **kwargs: FakeResponse(payload)
+    try:
+        return data_fetching._fetch_archive_daily(51.5, -0.1, "2000-01-01", "2000-01-02")
+    finally:
+        data_fetching.http_get = original
+
+def build_stages(days):
+    # (name, rows processed, setup -> input, run(input)) for one data size
+    response = hourly_response(days, HOURLY_VARIABLES)
+    payload = daily_payload(days, DAILY_VARIABLES)
+    hourly_df = parse_hourly_response(response, HOURLY_VARIABLES)
+    daily_df = _daily_frame(payload)
+    hourly_rows, daily_rows = len(hourly_df), len(daily_df)
+
+    return [
+        ("parse_hourly", hourly_rows, lambda: parse_hourly_response(response, HOURLY_VARIABLES)),
+        ("daily_frame", daily_rows, lambda: _daily_frame(payload)),
+        ("rollups_hourly", hourly_rows, lambda: compute_rollups(hourly_df, list(HOURLY_ROLLUPS.values()))),
+        ("rollups_daily", daily_rows, lambda: compute_rollups(daily_df, list(DAILY_ROLLUPS.values()))),
+        ("trend_linear", hourly_rows, lambda: fit_trends(hourly_df, ["temperature_2m"], "Linear")),
+        ("trend_rolling", hourly_rows, lambda: fit_trends(hourly_df, ["temperature_2m"], "Rolling Mean")),
+        ("trend_loess", hourly_rows, lambda: fit_trends(hourly_df, ["temperature_2m"], "LOESS")),
+        ("figure", hourly_rows, lambda: plot_chart(hourly_df, "time", "temperature_2m", "Temperature")),
+    ]
+
+def measure(run, repeat):
+    run()  # warm-up (lazy imports, caches)
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+def compare(result, baseline, tolerance):
+    if baseline is None:
+        return "new"
+    slower = result["seconds"] > baseline["seconds"] * (1 + tolerance) and \
+        result["seconds"] - baseline["seconds"] > MIN_SECONDS
+    hungrier = result["peak_mb"] > baseline["peak_mb"] * (1 + tolerance) and \
+        result["peak_mb"] - baseline["peak_mb"] > 1
+    if slower or hungrier:
+        return "REGRESSION"
+    if result["seconds"] < baseline["seconds"] * (1 - tolerance):
+        return "faster"
+    return "ok"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the fetch -> parse -> aggregate -> render pipeline.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--stages", nargs="+", help="Only run these stages")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = 0
+    print(f"{'stage':<16}{'size':>5}{'rows':>10}{'ms':>11}{'rows/s':>13}{'peak MB':>10}  status")
+    for size in args.sizes:
+        for name, rows, run in build_stages(SIZES[size]):
+            if args.stages and name not in args.stages:
+                continue
+            seconds, peak = measure(run, args.repeat)
+            key = f"{name}/{size}"
+            results[key] = {"seconds": seconds, "rows": rows, "peak_mb": peak / 1e6}
+            status = compare(results[key], baseline.get(key), args.tolerance)
+            regressions += status == "REGRESSION"
+            print(f"{name:<16}{size:>5}{rows:>10}{seconds * 1000:>11.2f}{rows / seconds:>13,.0f}"
+                  f"{peak / 1e6:>10.1f}  {status}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sys
+
+from functions import get_openmeteo_client, fetch_archive_daily_many, fetch_archive_hourly_many, write_export
+
+# Headless batch export, e.g.
+#   python cli.py sites.csv --start 2020-01-01 --end 2020-12-31 --kind hourly --format parquet --workers 8
+# The locations file is a CSV with name, latitude and longitude columns.
+
+
+def read_locations(path):
+    # [(name, slug, lat, lon)] in file order, one per row; slugs are numbered where names would
+    # otherwise share an output file
+    locations = []
+    slugs = set()
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            lat = float(row.get("latitude", row.get("lat")))
+            lon = float(row.get("longitude", row.get("lon")))
+            name = row.get("name") or f"{lat:.4f}_{lon:.4f}"
+            base = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_").lower() or "location"
+            slug, n = base, 1
+            while slug in slugs:
+                n += 1
+                slug = f"{base}_{n}"
+            slugs.add(slug)
+            locations.append((name, slug, lat, lon))
+    return locations
+
+
+def output_path(out_dir, slug, args):
+    return os.path.join(out_dir, f"{slug}_{args.kind}_{args.start}_{args.end}.{args.format}")
+
+
+def write_frame(df, path, fmt):
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        with open(path, "wb") as f:
+            write_export(df, fmt, f)
+
+
+async def run(args):
+    locations = read_locations(args.locations)
+    os.makedirs(args.out, exist_ok=True)
+
+    # Duplicate coordinates are fetched once (the fetchers also share identical in-flight requests)
+    coordinates = list(dict.fromkeys((lat, lon) for _, _, lat, lon in locations))
+    if args.kind == "daily":
+        results = fetch_archive_daily_many(coordinates, args.start, args.end, concurrency=args.workers)
+    else:
+        results = fetch_archive_hourly_many(coordinates, args.start, args.end, get_openmeteo_client(),
+                                            concurrency=args.workers)
+
+    failed = 0
+    done = 0
+    async for location, df, error in results:
+        for name, slug in [(name, slug) for name, slug, lat, lon in locations if (lat, lon) == location]:
+            done += 1
+            if error is not None:
+                failed += 1
+                print(f"[{done}/{len(locations)}] {name}: failed: {error}", file=sys.stderr)
+                continue
+            if df is None or df.empty:
+                failed += 1
+                print(f"[{done}/{len(locations)}] {name}: no data", file=sys.stderr)
+                continue
+            path = output_path(args.out, slug, args)
+            await asyncio.to_thread(write_frame, df, path, args.format)
+            print(f"[{done}/{len(locations)}] {name}: {len(df)} rows -> {path}", file=sys.stderr)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download Open-Meteo archive data for many locations.")
+    parser.add_argument("locations", help="CSV file with name, latitude and longitude columns")
+    parser.add_argument("--start", required=True, help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="Last day, YYYY-MM-DD")
+    parser.add_argument("--kind", choices=["daily", "hourly"], default="daily")
+    parser.add_argument("--format", choices=["parquet", "csv", "csv.gz", "arrow"], default="parquet")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--workers", type=int, default=8, help="Locations fetched in parallel")
+    args = parser.parse_args(argv)
+
+    failed = asyncio.run(run(args))
+    if failed:
+        print(f"{failed} location(s) failed or returned no data", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
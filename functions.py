@@ -1,11 +1,66 @@
-from utils.api_client import get_openmeteo_client
-from utils.data_fetching import (
-    get_forecast_daily as get_forecast_daily_weather,
-    get_archive_daily as get_archive_daily_weather,
-    get_archive_hourly as get_archive_hourly_weather
-)
-from utils.plotting import plot_chart
-from utils.parsing import parse_hourly_response as parse_openmeteo_hourly_response
+import importlib
 
 # This file is now clean and imports everything neatly.
 # Functions are still accessible under original names for compatibility.
+# Each public name maps to the utils module providing it; modules are imported on first use,
+# so a page only pays for the libraries it touches (the Daily page never loads the
+# Open-Meteo client).
+_EXPORTS = {
+    "get_openmeteo_client": ("utils.api_client", "get_openmeteo_client"),
+    "get_cache_stats": ("utils.api_client", "get_cache_stats"),
+    "get_forecast_daily_weather": ("utils.data_fetching", "get_forecast_daily"),
+    "get_archive_daily_weather": ("utils.data_fetching", "get_archive_daily"),
+    "get_archive_hourly_weather": ("utils.data_fetching", "get_archive_hourly"),
+    "get_archive_hourly_range_weather": ("utils.data_fetching", "get_archive_hourly_range"),
+    "add_hourly_columns_weather": ("utils.data_fetching", "add_hourly_columns"),
+    "fetch_archive_daily_many": ("utils.async_fetching", "fetch_archive_daily_many"),
+    "fetch_archive_hourly_many": ("utils.async_fetching", "fetch_archive_hourly_many"),
+    "FrameCache": ("utils.frame_cache", "FrameCache"),
+    "http_get": ("utils.http_session", "http_get"),
+    "get_request_stats": ("utils.http_session", "get_request_stats"),
+    "downsample": ("utils.downsampling", "downsample"),
+    "time_bounds": ("utils.downsampling", "time_bounds"),
+    "zoom_window": ("utils.downsampling", "zoom_window"),
+    "MAX_CHART_POINTS": ("utils.downsampling", "MAX_POINTS"),
+    "plot_chart": ("utils.plotting", "plot_chart"),
+    "fit_trends": ("utils.trends", "fit_trends"),
+    "TREND_METHODS": ("utils.trends", "TREND_METHODS"),
+    "compute_rollups": ("utils.rollups", "compute_rollups"),
+    "HOURLY_ROLLUPS": ("utils.rollups", "HOURLY_ROLLUPS"),
+    "DAILY_ROLLUPS": ("utils.rollups", "DAILY_ROLLUPS"),
+    "parse_openmeteo_hourly_response": ("utils.parsing", "parse_hourly_response"),
+    "get_climatology": ("utils.climatology", "get_climatology"),
+    "compare_with_normals": ("utils.climatology", "compare_with_normals"),
+    "export_frame": ("utils.export", "export_frame"),
+    "write_export": ("utils.export", "write_export"),
+    "EXPORT_FORMATS": ("utils.export", "EXPORT_FORMATS"),
+    "search_places": ("utils.geocoding", "search_places"),
+    "reverse_geocode": ("utils.geocoding", "reverse_geocode"),
+    "geocode_city": ("utils.geocoding", "geocode_city"),
+    "geocode_postcode": ("utils.geocoding", "geocode_postcode"),
+    "snap_to_grid": ("utils.grid", "snap_to_grid"),
+    "get_flight_stats": ("utils.data_fetching", "get_flight_stats"),
+    "CalendarIndex": ("utils.calendar_index", "CalendarIndex"),
+    "get_daily_timeline": ("utils.timeline", "get_daily_timeline"),
+    "forecast_cycle": ("utils.timeline", "forecast_cycle"),
+    "FORECAST_DAYS": ("utils.timeline", "FORECAST_DAYS"),
+    "begin_page": ("utils.metrics", "begin_page"),
+    "end_page": ("utils.metrics", "end_page"),
+    "span": ("utils.metrics", "span"),
+    "prometheus_text": ("utils.metrics", "prometheus_text"),
+    "start_metrics_server": ("utils.metrics", "start_metrics_server"),
+    "lazy_import": ("utils.lazy", "lazy_import"),
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
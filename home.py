@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
 import pandas as pd
 
+from functions import geocode_city, geocode_postcode
+
 st.title(" Welcome to the Weather Analytics App")
 st.markdown("Analyze weather trends by selecting a **City**, **Postcode**, or using **Manual Coordinates**.")
 
@@ -13,42 +14,34 @@ if input_mode == "City":
 
     if st.button(" Get Coordinates"):
         with st.spinner("Looking up city..."):
-            url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
-            res = requests.get(url)
-            if res.status_code == 200:
-                data = res.json()
-                if data.get("results"):
-                    lat = data["results"][0]["latitude"]
-                    lon = data["results"][0]["longitude"]
-                    st.session_state["latitude"] = lat
-                    st.session_state["longitude"] = lon
-                    st.success(f"{city}: {lat}, {lon}")
-                    st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
-                else:
-                    st.warning("City not found.")
-            else:
+            result = geocode_city(city)
+            if result is None:
                 st.error("City lookup failed.")
+            elif result:
+                lat = result["latitude"]
+                lon = result["longitude"]
+                st.session_state["latitude"] = lat
+                st.session_state["longitude"] = lon
+                st.success(f"{city}: {lat}, {lon}")
+                st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
+            else:
+                st.warning("City not found.")
 
 elif input_mode == "Postcode":
     postcode = st.text_input("Enter UK postcode", "SW1A 1AA")
 
     if st.button(" Get Coordinates from Postcode"):
         with st.spinner("Looking up postcode..."):
-            postcode_url = f"https://api.postcodes.io/postcodes/{postcode}"
-            res = requests.get(postcode_url)
-            if res.status_code == 200:
-                data = res.json()
-                if data["status"] == 200:
-                    lat = data["result"]["latitude"]
-                    lon = data["result"]["longitude"]
-                    st.session_state["latitude"] = lat
-                    st.session_state["longitude"] = lon
-                    st.success(f" {postcode}: {lat}, {lon}")
-                    st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
-                else:
-                    st.warning("Invalid postcode.")
+            result = geocode_postcode(postcode)
+            if result:
+                lat = result["latitude"]
+                lon = result["longitude"]
+                st.session_state["latitude"] = lat
+                st.session_state["longitude"] = lon
+                st.success(f" {postcode}: {lat}, {lon}")
+                st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
             else:
-                st.error("Postcode lookup failed.")
+                st.warning("Invalid postcode or lookup failed.")
 
 elif input_mode == "Manual Coordinates":
     lat = st.number_input("Latitude", value=51.5074)
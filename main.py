@@ -1,8 +1,8 @@
 import streamlit as st
 from streamlit_searchbox import st_searchbox
-import requests
 import pandas as pd
-import time
+
+from functions import search_places, reverse_geocode
 
 # Page configuration with custom theme
 st.set_page_config(
@@ -75,19 +75,9 @@ with st.sidebar:
 
 
 # --- Autocomplete Location Search ---
-@st.cache_data(ttl=3600, show_spinner=False)
+# Answered from the local place index and geocoding cache; Nominatim is only asked on a miss
 def search_locations(query):
-    if not query or len(query) < 3:
-        return []
-
-    url = f"https://nominatim.openstreetmap.org/search?format=json&q={query}"
-    headers = {"User-Agent": "weather-archive-app/1.0"}
-
-    try:
-        res = requests.get(url, headers=headers, timeout=5).json()
-        return [f"{item['display_name']}|{item['lat']}|{item['lon']}" for item in res[:8]]
-    except Exception:
-        return []
+    return [f"{place['name']}|{place['latitude']}|{place['longitude']}" for place in search_places(query)]
 
 
 st.markdown("### 🔍 Find your location")
@@ -99,7 +89,8 @@ with st.container():
         search_locations,
         key="city_search",
         placeholder="🔍 Start typing a location name (min 3 characters)",
-        label="Search for a location"
+        label="Search for a location",
+        debounce=300
     )
 
 # --- Location Selected Logic ---
@@ -136,9 +127,7 @@ if selection:
         - UV index
         """)
         if st.button("📈 Explore Daily Data", use_container_width=True):
-            with st.spinner("Loading daily view..."):
-                time.sleep(0.5)  # Small delay for better UX
-                st.switch_page("pages/Daily_Data.py")
+            st.switch_page("pages/Daily_Data.py")
 
     with col2:
         st.markdown("""
@@ -149,9 +138,7 @@ if selection:
         - Wind direction
         """)
         if st.button("🔍 Explore Hourly Data", use_container_width=True):
-            with st.spinner("Loading hourly view..."):
-                time.sleep(0.5)  # Small delay for better UX
-                st.switch_page("pages/Hourly_Data.py")
+            st.switch_page("pages/Hourly_Data.py")
 
 # --- Fallback Manual Entry with improved UI ---
 elif st.checkbox("Can't find your location? Enter coordinates manually"):
@@ -168,13 +155,7 @@ elif st.checkbox("Can't find your location? Enter coordinates manually"):
     if st.button("📍 Set Coordinates", use_container_width=True):
         # Reverse geocode to get location name if not provided
         if not location_name:
-            try:
-                url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={manual_lat}&lon={manual_lon}"
-                headers = {"User-Agent": "weather-archive-app/1.0"}
-                res = requests.get(url, headers=headers, timeout=5).json()
-                location_name = res.get("display_name", "Custom Location")
-            except:
-                location_name = f"Location at {manual_lat:.2f}, {manual_lon:.2f}"
+            location_name = reverse_geocode(manual_lat, manual_lon) or f"Location at {manual_lat:.2f}, {manual_lon:.2f}"
 
         st.session_state["city"] = location_name
         st.session_state["latitude"] = manual_lat
@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import timedelta
-import time
-from functions import get_archive_daily_weather, plot_chart
+from functions import (
+    get_archive_daily_weather, plot_chart, FrameCache, compute_rollups, DAILY_ROLLUPS,
+    downsample, time_bounds, zoom_window, MAX_CHART_POINTS, fit_trends, TREND_METHODS, lazy_import,
+    get_climatology, compare_with_normals, export_frame, EXPORT_FORMATS, snap_to_grid,
+    get_daily_timeline, forecast_cycle, FORECAST_DAYS, begin_page, end_page, span
+)
+
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 # Page config
 st.set_page_config(page_title="Daily Weather Data", page_icon="📊", layout="wide")
+begin_page("daily")
 
 # Custom CSS
 st.markdown("""
@@ -64,6 +70,8 @@ with st.sidebar:
 
     st.success(f"📍 Location: **{city_daily}**")
     st.text(f"Coordinates: {lat:.4f}, {lon:.4f}")
+    grid_lat, grid_lon = snap_to_grid(lat, lon)
+    st.caption(f"Data for the nearest 0.1° grid point ({grid_lat:.1f}, {grid_lon:.1f}) at the model's grid-cell elevation")
 
     st.markdown("---")
 
@@ -134,6 +142,15 @@ with date_col2:
                                  min_value=start_date,
                                  max_value=max_date)
 
+# The forecast continues ranges that reach the present
+include_forecast = st.checkbox(f"Include forecast (next {FORECAST_DAYS} days)", value=False)
+reaches_present = pd.Timestamp(end_date).date() >= pd.Timestamp.now().date() - timedelta(days=1)
+if include_forecast and reaches_present:
+    forecast_end = pd.Timestamp.now().date() + timedelta(days=FORECAST_DAYS)
+    end_date = end_date + (forecast_end - pd.Timestamp(end_date).date())
+elif include_forecast:
+    st.caption("The forecast is only added to ranges that end yesterday or later.")
+
 st.caption(f"📅 Requesting data from **{start_date.strftime('%B %d, %Y')}** to **{end_date.strftime('%B %d, %Y')}**")
 
 # Date range warning
@@ -144,13 +161,26 @@ if date_diff > 365 * 5:
 # Data loading with progress indicator
 try:
     with st.spinner("Loading weather data..."):
-        progress_bar = st.progress(0)
-        for i in range(100):
-            # Simulate progress while data loads
-            time.sleep(0.01)
-            progress_bar.progress(i + 1)
+        # Parsed frames are kept in memory for the session (shared with the Hourly page)
+        frame_cache = st.session_state.setdefault("frame_cache", FrameCache())
+        # Keyed on the archive grid cell, so nearby coordinates share one entry
+        frame_key = ("daily", grid_lat, grid_lon, pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date())
 
-        df = get_archive_daily_weather(lat, lon, start_date, end_date)
+        progress_bar = st.progress(0)
+        report = lambda fraction, text: progress_bar.progress(fraction, text=text)
+        forecast_from = None
+        if include_forecast and reaches_present:
+            # Archive and forecast come in together; the forecast part is refreshed with each model run
+            frame_key += ("forecast", forecast_cycle())
+            with span("load_data"):
+                df, forecast_from = frame_cache.get_or_load(frame_key, lambda: get_daily_timeline(
+                    lat, lon, start_date, end_date, progress=report
+                )) or (None, None)
+        else:
+            with span("load_data"):
+                df = frame_cache.get_or_load(frame_key, lambda: get_archive_daily_weather(
+                    lat, lon, start_date, end_date, progress=report
+                ))
         progress_bar.empty()
 
         if df is None or df.empty:
@@ -163,11 +193,6 @@ try:
             """)
             st.stop()
 
-        # Process dataframe
-        df["time"] = pd.to_datetime(df["time"])
-        if "Wind Speed 10m Max" in df.columns:
-            df.rename(columns={"Wind Speed 10m Max": "wind_speed_10m_max"}, inplace=True)
-
         # Data quality check
         missing_data_pct = df.isna().sum().sum() / (df.shape[0] * df.shape[1]) * 100
         if missing_data_pct > 20:
@@ -188,6 +213,9 @@ except Exception as e:
 # Success message and data overview
 st.success(f"✅ Successfully loaded data for {date_diff + 1} days")
 
+# Weekly and monthly aggregates are computed once per loaded frame and cached next to it
+rollups = frame_cache.get_or_load(frame_key + ("rollups",), lambda: compute_rollups(df, list(DAILY_ROLLUPS.values())))
+
 # Display key metrics in nice format
 st.markdown("### 📈 Key Statistics")
 
@@ -228,12 +256,23 @@ with metrics_expander:
 # Raw data table with download option
 with st.expander("📋 View Raw Data Table", expanded=False):
     st.dataframe(df, use_container_width=True)
-    st.download_button(
-        "⬇️ Download Raw Data as CSV",
-        df.to_csv(index=False),
-        file_name=f"weather_daily_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv",
-        mime="text/csv"
-    )
+
+    # Files are only serialized when asked for, then kept with the loaded frame
+    export_format = st.selectbox("File format", list(EXPORT_FORMATS), key="daily_export_format")
+    export_key = frame_key + ("export", export_format)
+    export_data = frame_cache.get(export_key)
+    if export_data is None and st.button("📦 Prepare Raw Data Download"):
+        with st.spinner("Preparing file..."):
+            export_data = export_frame(df, export_format)
+            frame_cache.put(export_key, export_data)
+    if export_data is not None:
+        st.download_button(
+            "⬇️ Download Raw Data",
+            export_data,
+            file_name=f"weather_daily_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}"
+                      f".{EXPORT_FORMATS[export_format]['extension']}",
+            mime=EXPORT_FORMATS[export_format]["mime"]
+        )
 
 # Main visualization section
 st.markdown("### 📊 Visualize Weather Parameters")
@@ -260,6 +299,10 @@ with viz_col2:
     aggregation = st.radio("Aggregate Data By", ["Daily", "Weekly", "Monthly"])
 
     show_trendline = st.checkbox("Show Trendline", value=True)
+    trend_method = st.selectbox("Trend Type", TREND_METHODS) if show_trendline else None
+
+    show_normals = st.checkbox("Compare with climate normals", value=False,
+                               help="Day-of-year normals, 10th-90th percentile band and records since 1940")
 
     color_theme = st.selectbox(
         "Color Theme",
@@ -271,19 +314,18 @@ with viz_col2:
 # Process data based on aggregation
 with viz_col1:
     if aggregation != "Daily":
-        if aggregation == "Weekly":
-            df["period"] = df["time"].dt.to_period("W")
-        else:  # Monthly
-            df["period"] = df["time"].dt.to_period("M")
-
-        df_agg = df.groupby("period").agg({
-            y_col: "mean",
-            "time": "min"  # Keep the first date of each period
-        }).reset_index(drop=True)
-
-        chart_df = df_agg
+        agg_df = rollups[DAILY_ROLLUPS[aggregation]]["mean"]
     else:
-        chart_df = df
+        agg_df = df
+
+    # Long series are thinned before plotting; narrowing the zoom window re-thins the visible part
+    window_df = agg_df
+    if len(agg_df) > MAX_CHART_POINTS:
+        zoom_start, zoom_end = time_bounds(agg_df["time"])
+        zoom = st.slider("Zoom", min_value=zoom_start, max_value=zoom_end, value=(zoom_start, zoom_end),
+                         format="YYYY-MM-DD")
+        window_df = zoom_window(agg_df, "time", *zoom)
+    chart_df = downsample(window_df, "time", [y_col], method="minmax" if chart_type in ("Bar", "Scatter") else "lttb")
 
     # Create appropriate chart based on user selection
     if chart_type == "Line":
@@ -295,27 +337,6 @@ with viz_col1:
             color_discrete_sequence=px.colors.sequential.__getattribute__(color_theme)
         )
 
-        # Add trendline if requested (as a separate trace for line charts)
-        if show_trendline:
-            import numpy as np
-            from scipy import stats
-
-            # Calculate trendline
-            x_numeric = np.arange(len(chart_df))
-            slope, intercept, r_value, p_value, std_err = stats.linregress(x_numeric, chart_df[y_col])
-            trendline_y = intercept + slope * x_numeric
-
-            # Add trendline as a separate trace
-            fig.add_trace(
-                go.Scatter(
-                    x=chart_df["time"],
-                    y=trendline_y,
-                    mode="lines",
-                    name="Trend",
-                    line=dict(color="red", dash="dash"),
-                )
-            )
-
     elif chart_type == "Area":
         fig = px.area(
             chart_df,
@@ -333,15 +354,26 @@ with viz_col1:
             color_discrete_sequence=px.colors.sequential.__getattribute__(color_theme)
         )
     else:  # Scatter
-        # Scatter plots do support trendline parameter directly
         fig = px.scatter(
             chart_df,
             x="time",
             y=y_col,
             title=f"{selected_param} ({aggregation})",
-            color_discrete_sequence=px.colors.sequential.__getattribute__(color_theme),
-            trendline="ols" if show_trendline else None,
-            trendline_color_override="red"
+            color_discrete_sequence=px.colors.sequential.__getattribute__(color_theme)
+        )
+
+    # Add trendline if requested (as a separate trace for line and scatter charts), fitted on the
+    # full-resolution window and drawn at the plotted points
+    if show_trendline and chart_type in ("Line", "Scatter"):
+        trend = fit_trends(window_df, [y_col], trend_method)[y_col]
+        fig.add_trace(
+            go.Scatter(
+                x=chart_df["time"],
+                y=trend.loc[chart_df.index],
+                mode="lines",
+                name="Trend",
+                line=dict(color="red", dash="dash"),
+            )
         )
 
     # Enhance chart formatting
@@ -354,15 +386,50 @@ with viz_col1:
         height=500
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    if forecast_from is not None:
+        fig.add_vrect(
+            x0=forecast_from - pd.Timedelta(hours=12), x1=window_df["time"].max() + pd.Timedelta(hours=12),
+            fillcolor="orange", opacity=0.1, line_width=0,
+            annotation_text="Forecast", annotation_position="top left"
+        )
 
-    # Download chart option
-    st.download_button(
-        "⬇️ Download Chart as HTML",
-        fig.to_html(include_plotlyjs="cdn"),
-        file_name=f"{y_col}_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.html",
-        mime="text/html"
-    )
+    # Climate normals are built once per location from the full archive and then only extended
+    if show_normals and aggregation == "Daily":
+        climate_bar = st.progress(0)
+        climatology = frame_cache.get_or_load(("climatology", grid_lat, grid_lon, pd.Timestamp.now().date()), lambda: get_climatology(
+            lat, lon, progress=lambda fraction, text: climate_bar.progress(fraction, text=f"Climate record: {text}")
+        ))
+        climate_bar.empty()
+
+        if climatology and y_col in climatology:
+            compared = compare_with_normals(window_df, climatology, y_col)
+            normals = compared.loc[chart_df.index]
+            fig.add_trace(go.Scatter(x=normals["time"], y=normals["p90"], mode="lines", line=dict(width=0),
+                                     showlegend=False, hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=normals["time"], y=normals["p10"], mode="lines", line=dict(width=0),
+                                     fill="tonexty", fillcolor="rgba(128, 128, 128, 0.2)", name="Normal range (10th-90th)"))
+            fig.add_trace(go.Scatter(x=normals["time"], y=normals["mean"], mode="lines", name="Normal",
+                                     line=dict(color="gray", dash="dot")))
+            st.caption(
+                f"Average anomaly: **{compared['anomaly'].mean():+.1f}** vs the 1940-present normal · "
+                f"{int(compared['record_high'].sum())} record highs · {int(compared['record_low'].sum())} record lows"
+            )
+        else:
+            st.info("Climate normals are not available for this location.")
+    elif show_normals:
+        st.caption("Climate normals are shown on the Daily aggregation.")
+
+    with span("render_chart", chart="fig"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Download chart option (the HTML is only rendered on request)
+    if st.button("📦 Prepare Chart Download"):
+        st.download_button(
+            "⬇️ Download Chart as HTML",
+            fig.to_html(include_plotlyjs="cdn"),
+            file_name=f"{y_col}_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.html",
+            mime="text/html"
+        )
 
 # Enhanced statistics section with box plot
 st.markdown("### 📊 Statistical Analysis")
@@ -376,8 +443,8 @@ with stat_col1:
     # Monthly breakdown if data spans multiple months
     if (end_date.year - start_date.year) * 12 + end_date.month - start_date.month > 0:
         st.markdown("#### Monthly Averages")
-        monthly_data = df.set_index("time").resample("M")[y_col].mean().reset_index()
-        monthly_data["Month"] = monthly_data["time"].dt.strftime("%b %Y")
+        monthly_data = rollups[DAILY_ROLLUPS["Monthly"]]["mean"]
+        monthly_data = monthly_data.assign(Month=monthly_data["time"].dt.strftime("%b %Y"))
         st.dataframe(
             monthly_data[["Month", y_col]].rename(columns={y_col: selected_param}),
             use_container_width=True
@@ -392,21 +459,23 @@ with stat_col2:
         color_discrete_sequence=px.colors.sequential.__getattribute__(color_theme)
     )
     fig.update_layout(height=300, yaxis_title=selected_param)
-    st.plotly_chart(fig, use_container_width=True)
+    with span("render_chart", chart="fig"):
+        st.plotly_chart(fig, use_container_width=True)
 
 # Temperature Range Analysis (if applicable)
 if "temperature_2m_max" in df.columns and "temperature_2m_min" in df.columns:
     st.markdown("### 🌡️ Temperature Range Analysis")
 
     # Calculate temperature range
-    df["temp_range"] = df["temperature_2m_max"] - df["temperature_2m_min"]
+    temp_range = df["temperature_2m_max"] - df["temperature_2m_min"]
 
+    temp_df = downsample(df, "time", ["temperature_2m_max", "temperature_2m_min"])
     temp_fig = go.Figure()
 
     # Add range as a filled area
     temp_fig.add_trace(go.Scatter(
-        x=df["time"],
-        y=df["temperature_2m_max"],
+        x=temp_df["time"],
+        y=temp_df["temperature_2m_max"],
         fill=None,
         mode='lines',
         line_color='crimson',
@@ -414,8 +483,8 @@ if "temperature_2m_max" in df.columns and "temperature_2m_min" in df.columns:
     ))
 
     temp_fig.add_trace(go.Scatter(
-        x=df["time"],
-        y=df["temperature_2m_min"],
+        x=temp_df["time"],
+        y=temp_df["temperature_2m_min"],
         fill='tonexty',
         mode='lines',
         line_color='royalblue',
@@ -430,17 +499,20 @@ if "temperature_2m_max" in df.columns and "temperature_2m_min" in df.columns:
         height=400
     )
 
-    st.plotly_chart(temp_fig, use_container_width=True)
+    with span("render_chart", chart="temp_fig"):
+        st.plotly_chart(temp_fig, use_container_width=True)
 
     # Temperature range statistics
     temp_stats = st.columns(3)
     with temp_stats[0]:
-        st.metric("Average Daily Range", f"{df['temp_range'].mean():.1f}°C")
+        st.metric("Average Daily Range", f"{temp_range.mean():.1f}°C")
     with temp_stats[1]:
-        st.metric("Maximum Range", f"{df['temp_range'].max():.1f}°C")
+        st.metric("Maximum Range", f"{temp_range.max():.1f}°C")
     with temp_stats[2]:
-        st.metric("Minimum Range", f"{df['temp_range'].min():.1f}°C")
+        st.metric("Minimum Range", f"{temp_range.min():.1f}°C")
 
 # Footer
 st.markdown("---")
-st.caption("© 2025 Weather Analytics App | Data Source: Open-Meteo")
\ No newline at end of file
+st.caption("© 2025 Weather Analytics App | Data Source: Open-Meteo")
+
+end_page()
\ No newline at end of file
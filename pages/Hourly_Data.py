@@ -1,15 +1,19 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import timedelta, datetime
-import time
 
-from functions import get_openmeteo_client, get_archive_hourly_weather, parse_openmeteo_hourly_response
+from functions import (
+    get_openmeteo_client, add_hourly_columns_weather, FrameCache, compute_rollups, HOURLY_ROLLUPS,
+    downsample, time_bounds, zoom_window, MAX_CHART_POINTS, fit_trends, TREND_METHODS, lazy_import,
+    export_frame, EXPORT_FORMATS, snap_to_grid, CalendarIndex, begin_page, end_page, span
+)
+
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 # Page configuration
 st.set_page_config(page_title="Hourly Weather Data", page_icon="🕒", layout="wide")
+begin_page("hourly")
 
 # Custom CSS
 st.markdown("""
@@ -62,6 +66,8 @@ with st.sidebar:
 
     st.success(f"📍 Location: **{city_hourly}**")
     st.text(f"Coordinates: {lat:.4f}, {lon:.4f}")
+    grid_lat, grid_lon = snap_to_grid(lat, lon)
+    st.caption(f"Data for the nearest 0.1° grid point ({grid_lat:.1f}, {grid_lon:.1f}) at the model's grid-cell elevation")
 
     st.markdown("---")
 
@@ -81,7 +87,7 @@ with st.sidebar:
     - Cloud cover
     - And many more parameters
 
-    Note: Hourly data is limited to a 31-day period.
+    Long ranges are downloaded in chunks, so they take a little longer to load.
     """)
 
 # Main content
@@ -89,8 +95,8 @@ st.subheader(f"Hourly Weather Analysis for {city_hourly}")
 
 st.markdown("""
 <div class="highlight-box">
-⚠️ <b>Important:</b> Hourly archive data is limited to a maximum of 31 days per request. 
-For longer periods, please use the Daily Data view.
+ℹ️ <b>Tip:</b> Hourly data can be requested for any range. Ranges of several years 
+contain a lot of records, so the Daily Data view is often quicker for long-term trends.
 </div>
 """, unsafe_allow_html=True)
 
@@ -105,7 +111,7 @@ with date_col2:
     min_date = pd.Timestamp("1940-01-01").date()
 
     if mode == "Last Few Days":
-        days_ago = st.slider("Days to show", min_value=1, max_value=31, value=7)
+        days_ago = st.slider("Days to show", min_value=1, max_value=365, value=7)
         end_date = max_date
         start_date = end_date - timedelta(days=days_ago - 1)
 
@@ -137,12 +143,6 @@ with date_col2:
 
             start_date = pd.to_datetime(f"{selected_year}-{selected_month:02d}-01")
             end_date = next_month - timedelta(days=1)
-
-        # Ensure we don't exceed 31 days
-        date_range = (end_date - start_date).days + 1
-        if date_range > 31:
-            end_date = start_date + timedelta(days=30)  # Limit to 31 days
-            st.info(f"📅 Limited to first 31 days of {datetime(selected_year, selected_month, 1).strftime('%B %Y')}")
     else:
         # Manual date range
         start_date = st.date_input("Start date",
@@ -150,19 +150,15 @@ with date_col2:
                                    min_value=min_date,
                                    max_value=max_date)
 
-        # Calculate max end date (start_date + 30 days or yesterday, whichever is sooner)
-        max_end = min(start_date + timedelta(days=30), max_date)
-
         end_date = st.date_input("End date",
                                  value=min(start_date + timedelta(days=7), max_date),
                                  min_value=start_date,
-                                 max_value=max_end)
+                                 max_value=max_date)
 
-# Validate date range
+# Date range warning
 date_diff = (end_date - start_date).days
-if date_diff > 31:
-    st.error(f"❌ Selected range is {date_diff} days. Hourly data is limited to 31 days maximum.")
-    st.stop()
+if date_diff > 365 * 5:
+    st.warning(f"⚠️ You've selected a large date range ({date_diff} days). This might affect performance.")
 
 st.caption(
     f"📅 Requesting hourly data from **{start_date.strftime('%B %d, %Y')}** to **{end_date.strftime('%B %d, %Y')}** ({date_diff + 1} days)")
@@ -170,17 +166,60 @@ st.caption(
 # Initialize Open-Meteo client
 client = get_openmeteo_client()
 
+# Create parameter groups for better organization
+parameter_groups = {
+    "Temperature": ["temperature_2m", "apparent_temperature", "dew_point_2m"],
+    "Precipitation": ["rain", "precipitation", "snowfall", "snow_depth"],
+    "Wind": ["wind_speed_10m", "wind_speed_100m", "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m"],
+    "Atmospheric": ["pressure_msl", "surface_pressure", "vapour_pressure_deficit"],
+    "Humidity & Cloud": ["relative_humidity_2m", "cloud_cover", "cloud_cover_low", "cloud_cover_mid",
+                         "cloud_cover_high"],
+    "Soil Data": ["soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm",
+                  "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm", "soil_moisture_28_to_100cm"],
+    "Other": ["weather_code", "et0_fao_evapotranspiration"]
+}
+
+# Create a flat list of all parameters
+all_parameters = []
+for group, params in parameter_groups.items():
+    all_parameters.extend(params)
+
+# Parsed frames are kept in memory for the session (shared with the Daily page), so widget
+# changes don't refetch. Only the parameters being viewed are downloaded; the rest are fetched
+# on first use and merged into the cached frame for this location and date range.
+frame_cache = st.session_state.setdefault("frame_cache", FrameCache())
+frame_key = ("hourly", grid_lat, grid_lon, pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date())
+
+
+def load_hourly_columns(variables, progress=None):
+    frame = add_hourly_columns_weather(frame_cache.get(frame_key), lat, lon, start_date, end_date, client,
+                                       variables, progress=progress)
+    if frame is not None:
+        frame_cache.put(frame_key, frame)
+    return frame
+
+
+def fetch_hourly_columns(variables, message):
+    # Spinner and progress bar only when something actually has to be downloaded
+    frame = frame_cache.get(frame_key)
+    if frame is not None and all(v in frame.columns for v in variables):
+        return frame
+    with st.spinner(message):
+        progress_bar = st.progress(0)
+        frame = load_hourly_columns(variables,
+                                    progress=lambda fraction, text: progress_bar.progress(fraction, text=text))
+        progress_bar.empty()
+    return frame
+
+
 # Data loading with progress indicator
 try:
     with st.spinner("Loading hourly weather data..."):
         progress_bar = st.progress(0)
-        for i in range(100):
-            # Simulate progress while data loads
-            time.sleep(0.01)
-            progress_bar.progress(i + 1)
-
-        response = get_archive_hourly_weather(lat, lon, start_date, end_date, client)
-        df = parse_openmeteo_hourly_response(response)
+        selected_group = st.session_state.get("hourly_group", list(parameter_groups.keys())[0])
+        with span("load_data"):
+            df = load_hourly_columns(parameter_groups[selected_group],
+                                     progress=lambda fraction, text: progress_bar.progress(fraction, text=text))
         progress_bar.empty()
 
         if df is None or df.empty:
@@ -193,9 +232,6 @@ try:
             """)
             st.stop()
 
-        # Process dataframe
-        df["time"] = pd.to_datetime(df["time"])
-
         # Data quality check
         missing_data_pct = df.isna().sum().sum() / (df.shape[0] * df.shape[1]) * 100
         if missing_data_pct > 20:
@@ -216,26 +252,11 @@ except Exception as e:
 # Success message with data overview
 st.success(f"✅ Successfully loaded {len(df)} hourly records ({date_diff + 1} days)")
 
-# Create parameter groups for better organization
-parameter_groups = {
-    "Temperature": ["temperature_2m", "apparent_temperature", "dew_point_2m"],
-    "Precipitation": ["rain", "precipitation", "snowfall", "snow_depth"],
-    "Wind": ["wind_speed_10m", "wind_speed_100m", "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m"],
-    "Atmospheric": ["pressure_msl", "surface_pressure", "vapour_pressure_deficit"],
-    "Humidity & Cloud": ["relative_humidity_2m", "cloud_cover", "cloud_cover_low", "cloud_cover_mid",
-                         "cloud_cover_high"],
-    "Soil Data": ["soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm",
-                  "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm", "soil_moisture_28_to_100cm"],
-    "Other": ["weather_code", "et0_fao_evapotranspiration"]
-}
-
-# Create a flat list of all parameters
-all_parameters = []
-for group, params in parameter_groups.items():
-    all_parameters.extend(params)
-
-# Filter to only include parameters available in the data
-available_parameters = [param for param in all_parameters if param in df.columns]
+# All coarser resolutions are computed once per loaded frame and cached next to it
+rollups = frame_cache.get_or_load(
+    frame_key + ("rollups", tuple(df.columns)),
+    lambda: compute_rollups(df, list(HOURLY_ROLLUPS.values()))
+)
 
 # Tab layout for better organization
 st.markdown("### 📊 Analyze Weather Parameters")
@@ -247,7 +268,8 @@ with tab1:
     selected_group = st.selectbox(
         "Select Parameter Group",
         list(parameter_groups.keys()),
-        index=0
+        index=0,
+        key="hourly_group"
     )
 
     # Get parameters in this group that are available in the data
@@ -274,27 +296,32 @@ with tab1:
             with chart_col2:
                 time_resolution = st.radio(
                     "Time Resolution",
-                    ["Hourly", "3-Hour", "6-Hour", "12-Hour"],
+                    ["Hourly"] + list(HOURLY_ROLLUPS.keys()),
                     index=0
                 )
 
             with chart_col3:
                 show_trend = st.checkbox("Show Trend Line", value=False)
+                trend_method = st.selectbox("Trend Type", TREND_METHODS) if show_trend else None
 
             # Process data based on time resolution
             if time_resolution != "Hourly":
-                if time_resolution == "3-Hour":
-                    freq = "3H"
-                elif time_resolution == "6-Hour":
-                    freq = "6H"
-                else:  # 12-Hour
-                    freq = "12H"
-
-                # Resample data
-                df_resampled = df.set_index("time").resample(freq).mean().reset_index()
+                df_resampled = rollups[HOURLY_ROLLUPS[time_resolution]]["mean"]
             else:
                 df_resampled = df
 
+            # Long series are thinned before plotting; narrowing the zoom window re-thins the visible part
+            df_window = df_resampled
+            if len(df_resampled) > MAX_CHART_POINTS:
+                zoom_start, zoom_end = time_bounds(df_resampled["time"])
+                zoom = st.slider("Zoom", min_value=zoom_start, max_value=zoom_end, value=(zoom_start, zoom_end),
+                                 format="YYYY-MM-DD")
+                df_window = zoom_window(df_resampled, "time", *zoom)
+
+            # Trends for all selected parameters are fitted in one batched call on the full-resolution window
+            if show_trend:
+                trends = fit_trends(df_window, selected_params, trend_method)
+
             # Create charts for each selected parameter
             for param in selected_params:
                 # Get human-readable parameter name
@@ -315,9 +342,10 @@ with tab1:
                     color_scheme = "Oranges"
 
                 # Create appropriate chart
+                chart_df = downsample(df_window, "time", [param], method="minmax" if chart_type == "Scatter" else "lttb")
                 if chart_type == "Line":
                     fig = px.line(
-                        df_resampled,
+                        chart_df,
                         x="time",
                         y=param,
                         title=f"{param_name} ({time_resolution})",
@@ -327,7 +355,7 @@ with tab1:
 
                 elif chart_type == "Scatter":
                     fig = px.scatter(
-                        df_resampled,
+                        chart_df,
                         x="time",
                         y=param,
                         title=f"{param_name} ({time_resolution})",
@@ -337,7 +365,7 @@ with tab1:
 
                 else:  # Area
                     fig = px.area(
-                        df_resampled,
+                        chart_df,
                         x="time",
                         y=param,
                         title=f"{param_name} ({time_resolution})",
@@ -345,39 +373,15 @@ with tab1:
 
                     )
 
-                # Add trendline separately if required (using statsmodels manually)
+                # Add trendline separately if required, at the plotted points
                 if show_trend:
-                    try:
-                        import statsmodels.api as sm
-                        import numpy as np
-
-                        # Convert datetime to numeric values for regression
-                        x_numeric = np.array([(t - pd.Timestamp('1970-01-01')) // pd.Timedelta('1s')
-                                              for t in df_resampled['time']])
-
-                        # Prepare the data, removing any NaN values
-                        mask = ~np.isnan(df_resampled[param])
-                        if sum(mask) > 1:  # Need at least 2 points for regression
-                            X = sm.add_constant(x_numeric[mask])
-                            y = df_resampled[param][mask]
-
-                            # Fit the model
-                            model = sm.OLS(y, X).fit()
-
-                            # Predict values for all points
-                            X_all = sm.add_constant(x_numeric)
-                            predictions = model.predict(X_all)
-
-                            # Add trend line to the figure
-                            fig.add_trace(go.Scatter(
-                                x=df_resampled['time'],
-                                y=predictions,
-                                mode='lines',
-                                name='Trend',
-                                line=dict(color='rgba(255, 0, 0, 0.7)', width=2, dash='dash')
-                            ))
-                    except (ImportError, Exception) as e:
-                        st.warning(f"Could not generate trendline: {str(e)}")
+                    fig.add_trace(go.Scatter(
+                        x=chart_df['time'],
+                        y=trends.loc[chart_df.index, param],
+                        mode='lines',
+                        name='Trend',
+                        line=dict(color='rgba(255, 0, 0, 0.7)', width=2, dash='dash')
+                    ))
 
                 # Enhance chart appearance
                 fig.update_layout(
@@ -388,7 +392,8 @@ with tab1:
                     plot_bgcolor="white"
                 )
 
-                st.plotly_chart(fig, use_container_width=True)
+                with span("render_chart", chart="fig"):
+                    st.plotly_chart(fig, use_container_width=True)
 
                 # Statistics for this parameter
                 stat_cols = st.columns(4)
@@ -407,90 +412,92 @@ with tab2:
     # Select a parameter for time analysis
     time_param = st.selectbox(
         "Select Parameter for Time Analysis",
-        available_parameters,
-        index=0 if "temperature_2m" in available_parameters else 0
+        all_parameters,
+        index=all_parameters.index(group_params[0]) if group_params else 0
     )
 
     time_param_name = time_param.replace("_", " ").title()
+    loaded = fetch_hourly_columns([time_param], f"Loading {time_param_name}...")
+    if loaded is None or time_param not in loaded.columns:
+        st.error(f"❌ {time_param_name} could not be loaded for this location and date range. Please try again later.")
+    else:
+        df = loaded
 
-    # Add time properties
-    df["hour"] = df["time"].dt.hour
-    df["day"] = df["time"].dt.day
-    df["dayofweek"] = df["time"].dt.dayofweek
-    df["date"] = df["time"].dt.date
+        # Calendar codes are built once per dataset; profiles are bincount reductions over them
+        calendar = frame_cache.get_or_load(frame_key + ("calendar",), lambda: CalendarIndex(df["time"]))
+        values = df[time_param].to_numpy()
 
-    # Create hourly pattern analysis
-    st.subheader("Hourly Pattern")
+        # Create hourly pattern analysis
+        st.subheader("Hourly Pattern")
 
-    hourly_avg = df.groupby("hour")[time_param].mean().reset_index()
+        hourly_avg = calendar.aggregate(values, "hour").rename_axis("hour").rename(time_param).reset_index()
 
-    hourly_fig = px.line(
-        hourly_avg,
-        x="hour",
-        y=time_param,
-        title=f"Average {time_param_name} by Hour of Day",
-        markers=True
-    )
+        hourly_fig = px.line(
+            hourly_avg,
+            x="hour",
+            y=time_param,
+            title=f"Average {time_param_name} by Hour of Day",
+            markers=True
+        )
 
-    hourly_fig.update_layout(
-        xaxis=dict(
-            tickmode='linear',
-            tick0=0,
-            dtick=2
-        ),
-        xaxis_title="Hour of Day",
-        yaxis_title=time_param_name,
-        plot_bgcolor="white"
-    )
+        hourly_fig.update_layout(
+            xaxis=dict(
+                tickmode='linear',
+                tick0=0,
+                dtick=2
+            ),
+            xaxis_title="Hour of Day",
+            yaxis_title=time_param_name,
+            plot_bgcolor="white"
+        )
 
-    st.plotly_chart(hourly_fig, use_container_width=True)
+        with span("render_chart", chart="hourly_fig"):
+            st.plotly_chart(hourly_fig, use_container_width=True)
 
-    # Daily pattern if we have multiple days
-    if date_diff > 1:
-        st.subheader("Daily Pattern")
+        # Daily pattern if we have multiple days
+        if date_diff > 1:
+            st.subheader("Daily Pattern")
 
-        daily_avg = df.groupby("date")[time_param].mean().reset_index()
+            daily_avg = calendar.aggregate(values, "date").rename_axis("date").rename(time_param).reset_index()
 
-        daily_fig = px.bar(
-            daily_avg,
-            x="date",
-            y=time_param,
-            title=f"Average {time_param_name} by Date",
-            color_discrete_sequence=["#1976D2"]
-        )
+            daily_fig = px.bar(
+                daily_avg,
+                x="date",
+                y=time_param,
+                title=f"Average {time_param_name} by Date",
+                color_discrete_sequence=["#1976D2"]
+            )
 
-        daily_fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title=f"Average {time_param_name}",
-            plot_bgcolor="white"
-        )
+            daily_fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title=f"Average {time_param_name}",
+                plot_bgcolor="white"
+            )
 
-        st.plotly_chart(daily_fig, use_container_width=True)
+            with span("render_chart", chart="daily_fig"):
+                st.plotly_chart(daily_fig, use_container_width=True)
 
-    # Heatmap of hour x day if range is long enough
-    if date_diff > 3:
-        st.subheader("Hour × Day Heatmap")
+        # Heatmap of hour x day if range is long enough
+        if date_diff > 3:
+            st.subheader("Hour × Date Heatmap")
 
-        # Create pivot table: days vs hours
-        pivot_df = df.pivot_table(
-            values=time_param,
-            index="day",
-            columns="hour",
-            aggfunc="mean"
-        )
+            # One row per calendar date, so ranges longer than a month are not folded together
+            pivot_df = calendar.pivot(values, "date", "hour")
 
-        heatmap_fig = px.imshow(
-            pivot_df,
-            title=f"{time_param_name} Heatmap (Day × Hour)",
-            color_continuous_scale="Viridis"
-        )
+            heatmap_fig = px.imshow(
+                pivot_df,
+                title=f"{time_param_name} Heatmap (Date × Hour)",
+                color_continuous_scale="Viridis",
+                aspect="auto"
+            )
 
-        heatmap_fig.update_layout(
-            xaxis_title="Hour of Day",
-            yaxis_title="Day of Month"
-        )
+            heatmap_fig.update_layout(
+                xaxis_title="Hour of Day",
+                yaxis_title="Date"
+            )
 
-        st.plotly_chart(heatmap_fig, use_container_width=True)
+            with span("render_chart", chart="heatmap_fig"):
+                st.plotly_chart(heatmap_fig, use_container_width=True)
 
 with tab3:
     st.markdown("### 📋 Raw Data Table")
@@ -498,39 +505,55 @@ with tab3:
     # Column selection
     selected_columns = st.multiselect(
         "Select Columns to View",
-        ["time"] + available_parameters,
-        default=["time", "temperature_2m", "relative_humidity_2m", "precipitation"]
-        if "precipitation" in available_parameters else ["time", "temperature_2m", "relative_humidity_2m"]
+        ["time"] + all_parameters,
+        default=["time"] + group_params
     )
 
     if not selected_columns:
         st.info("Please select at least one column to display.")
     else:
         # Display filtered dataframe
-        df_display = df[selected_columns]
+        loaded = fetch_hourly_columns([c for c in selected_columns if c != "time"], "Loading columns...")
+        if loaded is not None:
+            df = loaded
+        unavailable = [c for c in selected_columns if c not in df.columns]
+        if unavailable:
+            st.error(f"❌ Could not load {', '.join(unavailable)}. Please try again later.")
+        df_display = df[[c for c in selected_columns if c in df.columns]]
         st.dataframe(df_display, use_container_width=True)
 
         # Download options
         st.markdown("### 📥 Download Options")
 
-        download_col1, download_col2 = st.columns(2)
-
-        with download_col1:
-            st.download_button(
-                "⬇️ Download Selected Columns",
-                df_display.to_csv(index=False),
-                file_name=f"hourly_weather_selected_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+        export_format = st.selectbox("File format", list(EXPORT_FORMATS), key="hourly_export_format")
+        extension = EXPORT_FORMATS[export_format]["extension"]
+        date_suffix = f"{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.{extension}"
 
-        with download_col2:
-            st.download_button(
-                "⬇️ Download All Data",
-                df.to_csv(index=False),
-                file_name=f"hourly_weather_full_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+        # Files are only serialized when asked for, then kept with the loaded frame for this column set
+        download_col1, download_col2 = st.columns(2)
+        exports = [
+            (download_col1, "Selected Columns", df_display, "selected"),
+            (download_col2, "All Loaded Data", df, "full"),
+        ]
+        for column, label, export_df, name in exports:
+            with column:
+                export_key = frame_key + ("export", export_format, tuple(export_df.columns))
+                export_data = frame_cache.get(export_key)
+                if export_data is None and st.button(f"📦 Prepare {label}", key=f"prepare_{name}"):
+                    with st.spinner("Preparing file..."):
+                        export_data = export_frame(export_df, export_format)
+                        frame_cache.put(export_key, export_data)
+                if export_data is not None:
+                    st.download_button(
+                        f"⬇️ Download {label}",
+                        export_data,
+                        file_name=f"hourly_weather_{name}_{date_suffix}",
+                        mime=EXPORT_FORMATS[export_format]["mime"],
+                        key=f"download_{name}"
+                    )
 
 # Footer
 st.markdown("---")
-st.caption("© 2025 Weather Analytics App | Data Source: Open-Meteo")
\ No newline at end of file
+st.caption("© 2025 Weather Analytics App | Data Source: Open-Meteo")
+
+end_page()
\ No newline at end of file
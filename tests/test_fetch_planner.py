@@ -0,0 +1,88 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from utils.fetch_planner import merge_frames, merge_intervals, plan_fetches, subtract_intervals
+
+# Dates are day numbers in January 2020 unless a case says otherwise.
+
+def d(day, month=1):
+    return date(2020, month, day)
+
+MERGE_INTERVALS = [
+    ("empty", [], []),
+    ("single", [(d(1), d(5))], [(d(1), d(5))]),
+    ("adjacent", [(d(1), d(3)), (d(4), d(6))], [(d(1), d(6))]),
+    ("overlapping", [(d(1), d(5)), (d(3), d(8))], [(d(1), d(8))]),
+    ("contained", [(d(1), d(9)), (d(3), d(4))], [(d(1), d(9))]),
+    ("unsorted", [(d(10), d(12)), (d(1), d(3))], [(d(1), d(3)), (d(10), d(12))]),
+    ("one day apart", [(d(1), d(3)), (d(5), d(6))], [(d(1), d(3)), (d(5), d(6))]),
+]
+
+SUBTRACT_INTERVALS = [
+    ("nothing covered", (d(1), d(10)), [], [(d(1), d(10))]),
+    ("fully covered", (d(1), d(10)), [(d(1), d(10))], []),
+    ("covered beyond both ends", (d(3), d(5)), [(d(1), d(10))], []),
+    ("covered middle", (d(1), d(10)), [(d(4), d(6))], [(d(1), d(3)), (d(7), d(10))]),
+    ("covered start", (d(1), d(10)), [(d(1), d(4))], [(d(5), d(10))]),
+    ("covered end", (d(1), d(10)), [(d(8), d(12))], [(d(1), d(7))]),
+    ("coverage outside", (d(10), d(20)), [(d(1), d(5)), (d(25), d(28))], [(d(10), d(20))]),
+    ("two holes", (d(1), d(10)), [(d(2), d(3)), (d(6), d(8))], [(d(1), d(1)), (d(4), d(5)), (d(9), d(10))]),
+    ("single day", (d(5), d(5)), [(d(1), d(4))], [(d(5), d(5))]),
+]
+
+# (name, coverage, start, end, variables, max_gap_days, expected segments)
+PLAN_FETCHES = [
+    ("no coverage", {}, d(1), d(31), ["a", "b"], 7, [(d(1), d(31), ["a", "b"])]),
+    ("fully covered", {"a": [(d(1), d(31))], "b": [(d(1), d(31))]}, d(1), d(31), ["a", "b"], 7, []),
+    ("adjacent coverage counts as one", {"a": [(d(1), d(10)), (d(11), d(31))]}, d(1), d(31), ["a"], 7, []),
+    ("missing tail", {"a": [(d(1), d(20))]}, d(1), d(31), ["a"], 7, [(d(21), d(31), ["a"])]),
+    ("missing head", {"a": [(d(10), d(31))]}, d(1), d(31), ["a"], 7, [(d(1), d(9), ["a"])]),
+    ("per-variable split", {"a": [(d(1), d(15))]}, d(1), d(31), ["a", "b"], -1,
+     [(d(1), d(15), ["b"]), (d(16), d(31), ["a", "b"])]),
+    ("split segments merge when adjacent", {"a": [(d(1), d(15))]}, d(1), d(31), ["a", "b"], 7,
+     [(d(1), d(31), ["a", "b"])]),
+    ("small gap is refetched", {"a": [(d(11), d(14))]}, d(1), d(20), ["a"], 7, [(d(1), d(20), ["a"])]),
+    ("large gap is skipped", {"a": [(d(11), d(25))]}, d(1), d(31), ["a"], 7,
+     [(d(1), d(10), ["a"]), (d(26), d(31), ["a"])]),
+    ("variables keep request order", {"b": [(d(1), d(31))]}, d(1), d(31), ["c", "b", "a"], 7,
+     [(d(1), d(31), ["c", "a"])]),
+    ("timestamps are accepted", {}, pd.Timestamp("2020-01-01"), "2020-01-02", ["a"], 7, [(d(1), d(2), ["a"])]),
+]
+
+def _frame(days, **columns):
+    return pd.DataFrame({"time": pd.to_datetime([f"2020-01-{day:02d}" for day in days]), **columns})
+
+MERGE_FRAMES = [
+    ("nothing", [None, _frame([])], None),
+    ("single frame", [_frame([1, 2], a=[1.0, 2.0])], _frame([1, 2], a=[1.0, 2.0])),
+    ("disjoint days are sorted", [_frame([3], a=[3.0]), _frame([1, 2], a=[1.0, 2.0])],
+     _frame([1, 2, 3], a=[1.0, 2.0, 3.0])),
+    ("earlier frame wins", [_frame([2], a=[20.0]), _frame([1, 2], a=[1.0, 2.0])], _frame([1, 2], a=[1.0, 20.0])),
+    ("columns are combined", [_frame([1], b=[5.0]), _frame([1], a=[1.0])], _frame([1], a=[1.0], b=[5.0])),
+]
+
+def _ids(table):
+    return [case[0] for case in table]
+
+@pytest.mark.parametrize("name, intervals, expected", MERGE_INTERVALS, ids=_ids(MERGE_INTERVALS))
+def test_merge_intervals(name, intervals, expected):
+    assert merge_intervals(intervals) == expected
+
+@pytest.mark.parametrize("name, bounds, intervals, expected", SUBTRACT_INTERVALS, ids=_ids(SUBTRACT_INTERVALS))
+def test_subtract_intervals(name, bounds, intervals, expected):
+    assert subtract_intervals(*bounds, intervals) == expected
+
+@pytest.mark.parametrize("name, coverage, start, end, variables, max_gap_days, expected", PLAN_FETCHES,
+                         ids=_ids(PLAN_FETCHES))
+def test_plan_fetches(name, coverage, start, end, variables, max_gap_days, expected):
+    assert plan_fetches(coverage, start, end, variables, max_gap_days) == expected
+
+@pytest.mark.parametrize("name, frames, expected", MERGE_FRAMES, ids=_ids(MERGE_FRAMES))
+def test_merge_frames(name, frames, expected):
+    actual = merge_frames(frames)
+    if expected is None:
+        assert actual is None
+    else:
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected, check_like=True)
@@ -1,8 +1,115 @@
-import openmeteo_requests
-import requests_cache
-from retry_requests import retry
+import os
+import threading
+import time
+from datetime import timedelta
+
+from utils.config import ARCHIVE_URL, FORECAST_URL
+from utils import metrics
+from utils.lazy import lazy_import
+from utils.rate_limit import RateLimitedAdapter, openmeteo_limiter
+
+openmeteo_requests = lazy_import("openmeteo_requests")
+requests_cache = lazy_import("requests_cache")
+retry_requests = lazy_import("retry_requests")
+
+# HTTP cache for the Open-Meteo client. "sqlite" runs in WAL mode: reads go in parallel without
+# a lock and writes are short serialized transactions. Its size is kept near CACHE_MAX_BYTES by
+# a background thread that drops the oldest-written responses (FIFO, not LRU) every
+# TRIM_INTERVAL_SECONDS, so nothing on the request path pays for it. "filesystem" evicts
+# least-recently-used files itself, but every read and write takes one process-wide lock and
+# updates a shared index; "memory" is per process.
+CACHE_BACKEND = os.environ.get("OPENMETEO_CACHE_BACKEND", "sqlite")
+CACHE_NAME = os.environ.get("OPENMETEO_CACHE_NAME", ".http_cache")
+CACHE_MAX_BYTES = int(os.environ.get("OPENMETEO_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+TRIM_INTERVAL_SECONDS = 600
+
+# Recent archive days are provisional for up to STABLE_AFTER_DAYS, so archive responses expire
+# too; the Parquet archive store is what keeps final days permanently
+URLS_EXPIRE_AFTER = {
+    ARCHIVE_URL: timedelta(days=1),
+    FORECAST_URL: timedelta(minutes=15),
+    "*": timedelta(days=1),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+def _backend_options(backend):
+    if backend == "filesystem":
+        return {"backend": "filesystem", "max_cache_bytes": CACHE_MAX_BYTES}
+    if backend == "sqlite":
+        return {"backend": "sqlite", "wal": True}
+    if backend == "memory":
+        return {"backend": "memory"}
+    raise ValueError(f"Unknown cache backend: {backend!r}")
+
+def trim_cache(cache, max_bytes=CACHE_MAX_BYTES):
+    # Drops expired responses, then the oldest-written ones until the rest fit in max_bytes.
+    # This is FIFO by insertion order, not LRU: the cache does not record when a row was read.
+    # SQLite reuses the freed pages, so the file stops growing instead of shrinking.
+    cache.delete(expired=True)
+    responses = cache.responses
+    with responses.connection() as connection:
+        rows = connection.execute(f"SELECT key, LENGTH(value) FROM {responses.table_name} ORDER BY rowid").fetchall()
+    excess = sum(size for _, size in rows) - max_bytes
+    oldest = []
+    for key, size in rows:
+        if excess <= 0:
+            break
+        oldest.append(key)
+        excess -= size
+    if oldest:
+        responses.bulk_delete(oldest)
+    return len(oldest)
+
+def _trim_periodically(cache, interval=TRIM_INTERVAL_SECONDS):
+    while True:
+        try:
+            trim_cache(cache)
+        except Exception as e:
+            print(f"HTTP cache trim failed: {e}")
+        time.sleep(interval)
+
+def _record_cache_use(response, *args, **kwargs):
+    # requests_cache can dispatch response hooks twice for a fresh response; count it once
+    if getattr(response, "_cache_use_recorded", False):
+        return response
+    response._cache_use_recorded = True
+    metrics.increment("http_cache_requests_total", result="hit" if getattr(response, "from_cache", False) else "miss")
+    return response
+
+def make_cache_session(backend=CACHE_BACKEND, cache_name=CACHE_NAME):
+    session = requests_cache.CachedSession(
+        cache_name,
+        urls_expire_after=URLS_EXPIRE_AFTER,
+        **_backend_options(backend)
+    )
+    session.hooks["response"].append(_record_cache_use)
+    return session
 
 def get_openmeteo_client():
-    cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    return openmeteo_requests.Client(session=retry_session)
+    # One client (and cache connection) per process instead of one per rerun
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                with metrics.span("client_create"):
+                    cache_session = make_cache_session()
+                    if CACHE_BACKEND == "sqlite":
+                        threading.Thread(target=_trim_periodically, args=(cache_session.cache,), daemon=True).start()
+                    retry_session = retry_requests.retry(cache_session, retries=5, backoff_factor=0.2)
+                    # Cache misses share the per-request Open-Meteo rate limit with utils.http_session
+                    for prefix, adapter in list(retry_session.adapters.items()):
+                        limited = RateLimitedAdapter(openmeteo_limiter, max_retries=adapter.max_retries)
+                        retry_session.mount(prefix, limited)
+                    _client = openmeteo_requests.Client(session=retry_session)
+    return _client
+
+def get_cache_stats():
+    stats = {
+        "hits": metrics.counter_value("http_cache_requests_total", result="hit"),
+        "misses": metrics.counter_value("http_cache_requests_total", result="miss"),
+    }
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from utils.fetch_planner import merge_intervals
+from utils.metrics import timed
+
+STORE_DIR = ".archive_store"
+
+# The archive keeps revising the most recent days, so those are never stored
+STABLE_AFTER_DAYS = 7
+
+_write_lock = threading.Lock()
+
+def _as_date(value):
+    return pd.Timestamp(value).date()
+
+def cell_dir(kind, lat, lon):
+    return os.path.join(STORE_DIR, kind, f"{lat:.4f}_{lon:.4f}")
+
+def replace_atomically(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def load_coverage(kind, lat, lon):
+    path = os.path.join(cell_dir(kind, lat, lon), "coverage.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    return {
+        variable: [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in ranges]
+        for variable, ranges in raw.items()
+    }
+
+def _save_coverage(kind, lat, lon, coverage):
+    raw = {
+        variable: [(s.isoformat(), e.isoformat()) for s, e in ranges]
+        for variable, ranges in coverage.items()
+    }
+
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(raw, f)
+
+    replace_atomically(os.path.join(cell_dir(kind, lat, lon), "coverage.json"), write)
+
+def _covered_intervals(times):
+    # Day ranges that actually have rows; a chunk missing from a fetch stays uncovered
+    return merge_intervals([(day, day) for day in times.dt.date.unique()])
+
+def _time_mask(times, start, end):
+    lower = pd.Timestamp(start)
+    upper = pd.Timestamp(end) + pd.Timedelta(days=1)
+    if times.dt.tz is not None:
+        lower, upper = lower.tz_localize(times.dt.tz), upper.tz_localize(times.dt.tz)
+    return (times >= lower) & (times < upper)
+
+@timed("store_read")
+def read_archive(kind, lat, lon, start, end, variables):
+    start, end = _as_date(start), _as_date(end)
+    directory = cell_dir(kind, lat, lon)
+
+    frames = []
+    for year in range(start.year, end.year + 1):
+        path = os.path.join(directory, f"{year}.parquet")
+        if os.path.exists(path):
+            frames.append(pd.read_parquet(path))
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[_time_mask(df["time"], start, end)]
+    columns = ["time"] + [v for v in variables if v in df.columns]
+    return df[columns].reset_index(drop=True)
+
+@timed("store_write")
+def write_archive(kind, lat, lon, df, start, end, variables):
+    # Store only the stable part of a freshly fetched range
+    start = _as_date(start)
+    end = min(_as_date(end), date.today() - timedelta(days=STABLE_AFTER_DAYS))
+    if df is None or df.empty or start > end:
+        return
+
+    df = df[_time_mask(df["time"], start, end)]
+    if df.empty:
+        return
+    directory = cell_dir(kind, lat, lon)
+
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        for year, part in df.groupby(df["time"].dt.year):
+            path = os.path.join(directory, f"{year}.parquet")
+            part = part.set_index("time")
+            if os.path.exists(path):
+                part = part.combine_first(pd.read_parquet(path).set_index("time"))
+            part = part.sort_index().reset_index()
+            replace_atomically(path, lambda p: part.to_parquet(p, index=False))
+
+        covered = _covered_intervals(df["time"])
+        coverage = load_coverage(kind, lat, lon)
+        for variable in [v for v in variables if v in df.columns]:
+            coverage[variable] = merge_intervals(coverage.get(variable, []) + covered)
+        _save_coverage(kind, lat, lon, coverage)
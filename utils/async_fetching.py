@@ -0,0 +1,45 @@
+import asyncio
+
+from utils.data_fetching import HOURLY_VARIABLES, get_archive_daily, get_archive_hourly_range
+
+# Locations fetched at once. The requests-per-second limit is process-wide and applies to every
+# upstream HTTP call (utils.rate_limit, OPENMETEO_REQUESTS_PER_SECOND), not per location, since
+# one hourly location fans out into many chunk requests.
+DEFAULT_CONCURRENCY = 8
+
+async def _fetch_many(fetch, locations, concurrency):
+    # The blocking fetchers run in worker threads; the semaphore bounds how many at once.
+    # Yields (location, df, error); error is the exception a failed fetch raised, or None.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(location):
+        lat, lon = location
+        async with semaphore:
+            try:
+                return location, await asyncio.to_thread(fetch, lat, lon), None
+            except Exception as e:
+                return location, None, e
+
+    tasks = [asyncio.create_task(fetch_one(location)) for location in locations]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def fetch_archive_daily_many(locations, start, end, concurrency=DEFAULT_CONCURRENCY):
+    # Yields (location, df, error) for each (lat, lon) location as soon as it finishes
+    def fetch(lat, lon):
+        return get_archive_daily(lat, lon, start, end)
+
+    async for result in _fetch_many(fetch, locations, concurrency):
+        yield result
+
+async def fetch_archive_hourly_many(locations, start, end, client, variables=HOURLY_VARIABLES,
+                                    concurrency=DEFAULT_CONCURRENCY):
+    def fetch(lat, lon):
+        return get_archive_hourly_range(lat, lon, start, end, client, variables=variables)
+
+    async for result in _fetch_many(fetch, locations, concurrency):
+        yield result
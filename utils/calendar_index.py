@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = ("mean", "sum", "count", "min", "max")
+
+def day_positions(times):
+    # Leap-aware day of year: 29 February is position 59 and 1 March is always 60
+    times = pd.DatetimeIndex(times)
+    positions = times.dayofyear.to_numpy() - 1
+    return positions + ((~times.is_leap_year) & (times.month > 2))
+
+def _aggregate(codes, values, size, agg):
+    # Per-code reduction with bincount / ufunc.at; NaN values are skipped and empty groups are NaN
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    counts = np.bincount(codes, minlength=size)
+    if agg == "count":
+        return counts
+    if agg in ("min", "max"):
+        result = np.full(size, np.inf if agg == "min" else -np.inf)
+        (np.minimum if agg == "min" else np.maximum).at(result, codes, values)
+    else:
+        result = np.bincount(codes, weights=values, minlength=size)
+        if agg == "mean":
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                result = result / counts
+    return np.where(counts > 0, result, np.nan)
+
+class CalendarIndex:
+    # Integer calendar codes for a time column, built once per dataset and reused for every
+    # profile and heatmap; the source frame is never modified
+    def __init__(self, times):
+        times = pd.DatetimeIndex(times)
+        days = times.normalize()
+        first_day = days.min() if len(days) else pd.Timestamp(0)
+        years = times.year.to_numpy()
+
+        self.dates = pd.date_range(first_day, days.max(), freq="D") if len(days) else days[:0]
+        self.first_year = int(years.min()) if len(years) else 0
+        self.codes = {
+            "hour": times.hour.to_numpy(np.int64),
+            "dayofweek": times.dayofweek.to_numpy(np.int64),
+            "dayofyear": day_positions(times).astype(np.int64),
+            "week": times.isocalendar().week.to_numpy(np.int64) - 1,
+            "month": times.month.to_numpy(np.int64) - 1,
+            "year": years.astype(np.int64) - self.first_year,
+            "date": ((days - first_day) // pd.Timedelta(days=1)).to_numpy(np.int64),
+        }
+        self.sizes = {
+            "hour": 24, "dayofweek": 7, "dayofyear": 366, "week": 53, "month": 12,
+            "year": int(years.max()) - self.first_year + 1 if len(years) else 0,
+            "date": len(self.dates),
+        }
+
+    @property
+    def nbytes(self):
+        return sum(codes.nbytes for codes in self.codes.values())
+
+    def labels(self, by):
+        if by == "date":
+            return self.dates
+        if by == "year":
+            return np.arange(self.sizes["year"]) + self.first_year
+        if by in ("week", "month"):
+            return np.arange(self.sizes[by]) + 1
+        return np.arange(self.sizes[by])
+
+    def aggregate(self, values, by, agg="mean"):
+        # One value per calendar group, e.g. aggregate(temp, "hour") is the mean daily cycle
+        values = np.asarray(values, dtype=np.float64)
+        return pd.Series(_aggregate(self.codes[by], values, self.sizes[by], agg), index=self.labels(by))
+
+    def pivot(self, values, rows, columns, agg="mean"):
+        # rows x columns grid in one pass, e.g. pivot(temp, "date", "hour") for a heatmap
+        values = np.asarray(values, dtype=np.float64)
+        n_rows, n_columns = self.sizes[rows], self.sizes[columns]
+        codes = self.codes[rows] * n_columns + self.codes[columns]
+        grid = _aggregate(codes, values, n_rows * n_columns, agg).reshape(n_rows, n_columns)
+        return pd.DataFrame(grid, index=self.labels(rows), columns=self.labels(columns))
@@ -0,0 +1,182 @@
+import os
+import threading
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils import archive_store
+from utils.calendar_index import day_positions
+from utils.data_fetching import get_archive_daily, DAILY_VARIABLES
+from utils.grid import snap_to_grid
+from utils.metrics import timed
+
+CLIMATE_START = date(1940, 1, 1)
+
+# Normals and percentiles pool the days around each calendar day so that a single
+# unusual year (and the rarely seen 29 February) doesn't make the curve jagged
+WINDOW_DAYS = 15
+PERCENTILES = (10, 50, 90)
+DAY_POSITIONS = 366
+
+# The 1940-present backfill is downloaded a decade per request, so each request stays small
+# and progress moves per chunk; a failed chunk keeps what came before it
+CHUNK_YEARS = 10
+
+# One lock per grid cell; a long backfill for one location doesn't hold up the others
+_locks = {}
+_locks_lock = threading.Lock()
+
+def _cell_lock(lat, lon):
+    with _locks_lock:
+        return _locks.setdefault((lat, lon), threading.Lock())
+
+def _year_chunks(start, end, years=CHUNK_YEARS):
+    # [start, end] cut at calendar-aligned multiples of `years`, e.g. 1940-1949, 1950-1959, ...
+    chunks = []
+    while start <= end:
+        chunk_end = min(date(start.year // years * years + years - 1, 12, 31), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+def _state_path(lat, lon):
+    return os.path.join(archive_store.cell_dir("climatology", lat, lon), "days.npz")
+
+def _load_state(lat, lon):
+    # One (year x day position) matrix per variable, filled up to and including "through"
+    path = _state_path(lat, lon)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {
+            "first_year": int(data["first_year"]),
+            "through": date.fromisoformat(str(data["through"])),
+            "values": {name: data[name] for name in data.files if name not in ("first_year", "through")},
+        }
+
+def _save_state(lat, lon, state):
+    path = _state_path(lat, lon)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.savez(f, first_year=state["first_year"], through=state["through"].isoformat(), **state["values"])
+
+    archive_store.replace_atomically(path, write)
+
+def _add_days(state, df, variables):
+    rows = df["time"].dt.year.to_numpy() - state["first_year"]
+    positions = day_positions(df["time"])
+    n_years = rows.max() + 1
+
+    for variable in variables:
+        matrix = state["values"].get(variable, np.full((0, DAY_POSITIONS), np.nan, dtype=np.float32))
+        if len(matrix) < n_years:
+            padding = np.full((n_years - len(matrix), DAY_POSITIONS), np.nan, dtype=np.float32)
+            matrix = np.vstack([matrix, padding])
+        matrix[rows, positions] = df[variable].to_numpy(dtype=np.float32, na_value=np.nan)
+        state["values"][variable] = matrix
+
+@timed("climatology_update")
+def update_climatology(lat, lon, progress=None):
+    # Extends the stored matrices with any stable days downloaded since the last update
+    lat, lon = snap_to_grid(lat, lon)
+    end = date.today() - timedelta(days=archive_store.STABLE_AFTER_DAYS)
+    with _cell_lock(lat, lon):
+        state = _load_state(lat, lon)
+        if state is None or any(v not in state["values"] for v in DAILY_VARIABLES):
+            state = {"first_year": CLIMATE_START.year, "through": CLIMATE_START - timedelta(days=1), "values": {}}
+        start = state["through"] + timedelta(days=1)
+        if start > end:
+            return state
+
+        # A routine top-up that fails still leaves usable normals; an unfinished backfill does not
+        backfill = start < end - timedelta(days=366)
+        chunks = _year_chunks(start, end)
+        for i, (chunk_start, chunk_end) in enumerate(chunks):
+            def report(fraction, text, i=i, label=f"{chunk_start.year}-{chunk_end.year}"):
+                if progress is not None:
+                    progress((i + fraction) / len(chunks), f"{label}: {text}" if len(chunks) > 1 else text)
+
+            df = get_archive_daily(lat, lon, chunk_start, chunk_end, progress=report)
+            if df is None or df.empty:
+                return None if backfill or not state["values"] else state
+
+            _add_days(state, df, [v for v in DAILY_VARIABLES if v in df.columns])
+            state["through"] = chunk_end
+            _save_state(lat, lon, state)
+        return state
+
+def _nan_percentiles(pooled, percentiles):
+    # Linear-interpolated percentiles per row, ignoring NaN (which sort to the end)
+    ordered = np.sort(pooled, axis=1)
+    counts = np.isfinite(ordered).sum(axis=1)
+    result = {}
+    for p in percentiles:
+        rank = (counts - 1).clip(min=0) * (p / 100)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, (counts - 1).clip(min=0))
+        low_values = np.take_along_axis(ordered, lower[:, None], axis=1)[:, 0]
+        high_values = np.take_along_axis(ordered, upper[:, None], axis=1)[:, 0]
+        values = low_values + (high_values - low_values) * (rank - lower)
+        result[f"p{p}"] = np.where(counts > 0, values, np.nan)
+    return result
+
+def _records(matrix, first_year, highest):
+    filled = np.isfinite(matrix).any(axis=0)
+    fill = -np.inf if highest else np.inf
+    masked = np.where(np.isfinite(matrix), matrix, fill)
+    rows = masked.argmax(axis=0) if highest else masked.argmin(axis=0)
+    values = matrix[rows, np.arange(matrix.shape[1])]
+    return np.where(filled, values, np.nan), np.where(filled, first_year + rows, -1)
+
+@timed("climatology_summarize")
+def summarize(state, variables=DAILY_VARIABLES, baseline=None, window_days=WINDOW_DAYS, percentiles=PERCENTILES):
+    # Normals and percentiles use the baseline years (all years if None); records use the full record
+    first_year = state["first_year"]
+    half = window_days // 2
+    window = (np.arange(DAY_POSITIONS)[:, None] + np.arange(-half, half + 1)) % DAY_POSITIONS
+
+    summaries = {}
+    for variable in [v for v in variables if v in state["values"]]:
+        matrix = state["values"][variable]
+        normal_rows = matrix
+        if baseline is not None:
+            normal_rows = matrix[max(baseline[0] - first_year, 0):max(baseline[1] - first_year + 1, 0)]
+
+        pooled = normal_rows[:, window].transpose(1, 0, 2).reshape(DAY_POSITIONS, -1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(pooled, axis=1)
+            std = np.nanstd(pooled, axis=1)
+
+        record_max, record_max_year = _records(matrix, first_year, highest=True)
+        record_min, record_min_year = _records(matrix, first_year, highest=False)
+        summaries[variable] = pd.DataFrame({
+            "mean": mean,
+            "std": std,
+            **_nan_percentiles(pooled, percentiles),
+            "record_max": record_max,
+            "record_max_year": record_max_year,
+            "record_min": record_min,
+            "record_min_year": record_min_year,
+            "years": np.isfinite(matrix).sum(axis=0),
+        }).rename_axis("day")
+    return summaries
+
+def get_climatology(lat, lon, variables=DAILY_VARIABLES, baseline=None, progress=None):
+    state = update_climatology(lat, lon, progress=progress)
+    if state is None:
+        return None
+    return summarize(state, variables, baseline)
+
+def compare_with_normals(df, climatology, variable):
+    # Lines each day of df up with its calendar-day normal and reports the anomaly
+    normals = climatology[variable].iloc[day_positions(df["time"])].reset_index(drop=True)
+    compared = normals.set_index(df.index).assign(time=df["time"], value=df[variable])
+    compared["anomaly"] = compared["value"] - compared["mean"]
+    compared["record_high"] = compared["value"] >= compared["record_max"]
+    compared["record_low"] = compared["value"] <= compared["record_min"]
+    return compared
@@ -0,0 +1,28 @@
+import os
+
+# Upstream services. Each base URL can be overridden on its own (e.g. ARCHIVE_BASE_URL), or
+# all of them at once with MOCK_SERVER_URL, which routes every service to
+# <MOCK_SERVER_URL>/<service> as served by benchmarks/mock_server.py.
+UPSTREAMS = {
+    "forecast": "https://api.open-meteo.com",
+    "archive": "https://archive-api.open-meteo.com",
+    "geocoding": "https://geocoding-api.open-meteo.com",
+    "nominatim": "https://nominatim.openstreetmap.org",
+    "postcodes": "https://api.postcodes.io",
+}
+
+MOCK_SERVER_URL = os.environ.get("MOCK_SERVER_URL", "").rstrip("/")
+
+def base_url(service):
+    override = os.environ.get(f"{service.upper()}_BASE_URL")
+    if override:
+        return override.rstrip("/")
+    if MOCK_SERVER_URL:
+        return f"{MOCK_SERVER_URL}/{service}"
+    return UPSTREAMS[service]
+
+FORECAST_URL = f"{base_url('forecast')}/v1/forecast"
+ARCHIVE_URL = f"{base_url('archive')}/v1/archive"
+GEOCODING_URL = f"{base_url('geocoding')}/v1/search"
+NOMINATIM_URL = base_url("nominatim")
+POSTCODES_URL = f"{base_url('postcodes')}/postcodes"
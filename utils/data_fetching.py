@@ -1,14 +1,67 @@
-import requests
+import contextvars
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from utils import archive_store, fetch_planner
+from utils.config import ARCHIVE_URL, FORECAST_URL
+from utils.grid import GRID_ELEVATION, snap_to_grid
+from utils.single_flight import SingleFlight
+from utils.http_session import http_get
+from utils import metrics
+from utils.metrics import span, timed
+from utils.parsing import parse_hourly_response
+
+DAILY_VARIABLES = [
+    "temperature_2m_max", "temperature_2m_min", "rain_sum", "precipitation_sum",
+    "wind_speed_10m_max", "uv_index_max"
+]
+
+HOURLY_VARIABLES = [
+    "temperature_2m", "wind_speed_100m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature",
+    "rain", "precipitation", "snowfall", "snow_depth",
+    "soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm",
+    "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm",
+    "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm",
+    "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm",
+    "weather_code", "pressure_msl", "surface_pressure", "cloud_cover",
+    "cloud_cover_low", "cloud_cover_mid", "cloud_cover_high",
+    "et0_fao_evapotranspiration", "vapour_pressure_deficit", "wind_speed_10m",
+    "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m"
+]
+
+# Days of hourly data per archive request and how many requests run at once
+HOURLY_CHUNK_DAYS = 92
+HOURLY_MAX_WORKERS = 4
+
+# Identical requests made at the same time (e.g. several sessions opening the same city)
+# share one upstream call and its parsed result, which callers must not modify in place
+_flights = SingleFlight()
+
+def _flight_key(kind, lat, lon, start, end, variables):
+    return kind, lat, lon, pd.Timestamp(start).date(), pd.Timestamp(end).date(), tuple(variables)
+
+def get_flight_stats():
+    return {
+        "calls": metrics.counter_value("single_flight_total", result="leader"),
+        "shared": metrics.counter_value("single_flight_total", result="shared"),
+        "in_flight": _flights.in_flight(),
+    }
 
 def get_forecast_daily(lat, lon, start, end):
+    lat, lon = snap_to_grid(lat, lon)
+    return _flights.do(_flight_key("forecast_daily", lat, lon, start, end, ()),
+                       lambda report: _fetch_forecast_daily(lat, lon, start, end))
+
+@timed("fetch_forecast_daily")
+def _fetch_forecast_daily(lat, lon, start, end):
+    # Same variable names as the archive, so the two can be merged column for column
     url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,"
-        f"uv_index_max,rain_sum,precipitation_sum,windspeed_10m_max"
-        f"&start_date={start}&end_date={end}&timezone=auto"
+        f"{FORECAST_URL}?"
+        f"latitude={lat}&longitude={lon}&elevation={GRID_ELEVATION}&daily={','.join(DAILY_VARIABLES)}"
+        f"&start_date={pd.Timestamp(start).date()}&end_date={pd.Timestamp(end).date()}&timezone=auto"
     )
-    res = requests.get(url)
+    res = http_get(url)
     if res.status_code == 200:
         data = res.json().get("daily", {})
         df = pd.DataFrame(data)
@@ -16,14 +69,14 @@ def get_forecast_daily(lat, lon, start, end):
         return df
     return None
 
-def get_archive_daily(lat, lon, start, end):
+@timed("fetch_archive_daily")
+def _fetch_archive_daily(lat, lon, start, end, variables=DAILY_VARIABLES):
     url = (
-        f"https://archive-api.open-meteo.com/v1/archive?"
-        f"latitude={lat}&longitude={lon}&start_date={start}&end_date={end}"
-        f"&daily=temperature_2m_max,temperature_2m_min,rain_sum,precipitation_sum,"
-        f"wind_speed_10m_max,uv_index_max&timezone=auto"
+        f"{ARCHIVE_URL}?"
+        f"latitude={lat}&longitude={lon}&elevation={GRID_ELEVATION}&start_date={start}&end_date={end}"
+        f"&daily={','.join(variables)}&timezone=auto"
     )
-    res = requests.get(url)
+    res = http_get(url)
     if res.status_code == 200:
         data = res.json().get("daily", {})
         df = pd.DataFrame(data)
@@ -31,24 +84,142 @@ def get_archive_daily(lat, lon, start, end):
         return df
     return None
 
-def get_archive_hourly(lat, lon, start, end, client):
+def _report(progress, fraction, text):
+    # progress is the shared call's report(); each caller's own callback is run on its own thread
+    progress(min(fraction, 1.0), text)
+
+def _load_archive(kind, lat, lon, start, end, variables, fetch_range, progress):
+    with span("load_archive", kind=kind):
+        return _load_archive_ranges(kind, lat, lon, start, end, variables, fetch_range, progress)
+
+def _load_archive_ranges(kind, lat, lon, start, end, variables, fetch_range, progress):
+    # Serve what the local store already has and only fetch the missing (variable, day) ranges
+    _report(progress, 0.0, "Checking stored data...")
+    coverage = archive_store.load_coverage(kind, lat, lon)
+    plan = fetch_planner.plan_fetches(coverage, start, end, variables)
+
+    fetched = []
+    for i, (range_start, range_end, range_variables) in enumerate(plan):
+        def report_range(done, total, i=i):
+            prefix = f"Range {i + 1} of {len(plan)}: " if len(plan) > 1 else ""
+            _report(progress, (i + done / total) / len(plan), f"{prefix}downloaded {done} of {total} chunks")
+
+        df = fetch_range(range_start, range_end, range_variables, report_range)
+        if df is None:
+            return None
+        archive_store.write_archive(kind, lat, lon, df, range_start, range_end, range_variables)
+        fetched.append(df)
+
+    _report(progress, 1.0, "Merging with stored data...")
+    stored = archive_store.read_archive(kind, lat, lon, start, end, variables)
+    df = fetch_planner.merge_frames(fetched + [stored])
+    if df is None:
+        return None
+    columns = ["time"] + [v for v in variables if v in df.columns]
+    return df if list(df.columns) == columns else df[columns]
+
+def get_archive_daily(lat, lon, start, end, progress=None):
+    # Every caller sharing the fetch gets progress updates
+    lat, lon = snap_to_grid(lat, lon)
+
+    def fetch_range(range_start, range_end, variables, report):
+        df = _fetch_archive_daily(lat, lon, range_start, range_end, variables)
+        report(1, 1)
+        return df
+
+    return _flights.do(
+        _flight_key("daily", lat, lon, start, end, DAILY_VARIABLES),
+        lambda report: _load_archive("daily", lat, lon, start, end, DAILY_VARIABLES, fetch_range, report),
+        progress
+    )
+
+def get_archive_hourly(lat, lon, start, end, client, variables=HOURLY_VARIABLES):
+    lat, lon = snap_to_grid(lat, lon)
+    return _flights.do(_flight_key("hourly_response", lat, lon, start, end, variables),
+                       lambda report: _request_archive_hourly(lat, lon, start, end, client, variables))
+
+@timed("fetch_archive_hourly")
+def _request_archive_hourly(lat, lon, start, end, client, variables):
     params = {
         "latitude": lat,
         "longitude": lon,
+        "elevation": GRID_ELEVATION,
         "start_date": str(start),
         "end_date": str(end),
-        "hourly": [
-            "temperature_2m", "wind_speed_100m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature",
-            "rain", "precipitation", "snowfall", "snow_depth",
-            "soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm",
-            "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm",
-            "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm",
-            "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm",
-            "weather_code", "pressure_msl", "surface_pressure", "cloud_cover",
-            "cloud_cover_low", "cloud_cover_mid", "cloud_cover_high",
-            "et0_fao_evapotranspiration", "vapour_pressure_deficit", "wind_speed_10m",
-            "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m"
-        ]
+        "hourly": list(variables)
     }
-    response = client.weather_api("https://archive-api.open-meteo.com/v1/archive", params=params)
+    response = client.weather_api(ARCHIVE_URL, params=params)
     return response[0] if response else None
+
+def split_date_range(start, end, chunk_days):
+    start = pd.Timestamp(start).date()
+    end = pd.Timestamp(end).date()
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+def _fetch_hourly_chunk(lat, lon, start, end, client, variables):
+    response = get_archive_hourly(lat, lon, start, end, client, variables)
+    return parse_hourly_response(response, variables) if response else None
+
+def _fetch_hourly_range(lat, lon, start, end, client, variables, chunk_days, max_workers, report=None):
+    # Any range is split into chunks that are fetched concurrently and stitched back together
+    chunks = split_date_range(start, end, chunk_days)
+    if not chunks:
+        return None
+
+    # A chunk that fails fails the whole range; a partial frame would silently leave a gap
+    frames = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        # Each chunk runs in a copy of the caller's context so its spans join the page trace
+        futures = [pool.submit(contextvars.copy_context().run, _fetch_hourly_chunk,
+                               lat, lon, s, e, client, variables)
+                   for s, e in chunks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            df = future.result()
+            if df is None:
+                for pending in futures:
+                    pending.cancel()
+                return None
+            if not df.empty:
+                frames.append(df)
+            if report is not None:
+                report(done, len(chunks))
+
+    # The result is always an owned, writable frame: concat copies, and a single parsed chunk is
+    # copied here so it no longer pins the response buffer
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0].copy()
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values("time").drop_duplicates("time").reset_index(drop=True)
+
+def get_archive_hourly_range(lat, lon, start, end, client, variables=HOURLY_VARIABLES,
+                             chunk_days=HOURLY_CHUNK_DAYS, max_workers=HOURLY_MAX_WORKERS, progress=None):
+    lat, lon = snap_to_grid(lat, lon)
+
+    def fetch_range(range_start, range_end, variables, report):
+        return _fetch_hourly_range(lat, lon, range_start, range_end, client, variables, chunk_days, max_workers,
+                                   report)
+
+    return _flights.do(
+        _flight_key("hourly", lat, lon, start, end, variables),
+        lambda report: _load_archive("hourly", lat, lon, start, end, variables, fetch_range, report),
+        progress
+    )
+
+def add_hourly_columns(df, lat, lon, start, end, client, variables, **kwargs):
+    # Returns df extended with whichever of `variables` it does not hold yet
+    missing = [v for v in variables if df is None or v not in df.columns]
+    if not missing:
+        return df
+    extra = get_archive_hourly_range(lat, lon, start, end, client, variables=missing, **kwargs)
+    if extra is None:
+        return df
+    if df is None:
+        return extra
+    return df.merge(extra, on="time", how="left")
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from utils.metrics import timed
+from utils.trends import epoch_seconds
+
+# More points than this per trace add nothing visible at typical chart widths
+MAX_POINTS = 2000
+
+def lttb_indices(x, y, n_out):
+    # Largest-triangle-three-buckets: keeps the point of each bucket that best preserves the shape
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x - x[0]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[i + 1] = selected
+    return indices
+
+def minmax_indices(y, n_out):
+    # Keeps the minimum and maximum of each bucket, so spikes always survive
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    indices = np.unique(np.concatenate([[0, n - 1], lows, highs]))
+    return indices[indices < n]
+
+@timed("downsample")
+def downsample(df, x, columns, max_points=MAX_POINTS, method="lttb"):
+    # Rows needed to draw each of `columns` against `x`; the union is returned so traces share x values
+    if len(df) <= max_points:
+        return df
+
+    x_values = epoch_seconds(df[x])
+    keep = []
+    for column in columns:
+        y_values = df[column].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(y_values))
+        if method == "lttb":
+            picked = lttb_indices(x_values[valid], y_values[valid], max_points)
+        else:
+            picked = minmax_indices(y_values[valid], max_points)
+        keep.append(valid[picked])
+    return df.iloc[np.unique(np.concatenate(keep))] if keep else df
+
+def time_bounds(times):
+    # First and last timestamp as naive datetimes, suitable for a Streamlit slider
+    bounds = times.iloc[[0, -1]]
+    if bounds.dt.tz is not None:
+        bounds = bounds.dt.tz_convert(None)
+    return bounds.iloc[0].to_pydatetime(), bounds.iloc[1].to_pydatetime()
+
+def zoom_window(df, x, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if df[x].dt.tz is not None:
+        start, end = start.tz_localize("UTC"), end.tz_localize("UTC")
+    return df[(df[x] >= start) & (df[x] <= end)]
@@ -0,0 +1,66 @@
+import gzip
+import io
+
+from utils.lazy import lazy_import
+from utils.metrics import timed
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+ipc = lazy_import("pyarrow.ipc")
+
+# Rows serialized at a time, so only one chunk is ever held in its encoded form
+CHUNK_ROWS = 100_000
+
+EXPORT_FORMATS = {
+    "CSV (gzip)": {"extension": "csv.gz", "mime": "application/gzip"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "Arrow IPC": {"extension": "arrow", "mime": "application/vnd.apache.arrow.file"},
+}
+
+def _chunks(df, chunk_rows):
+    # An empty frame still yields one (empty) chunk so headers and schemas get written
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def write_csv_gz(df, target, chunk_rows=CHUNK_ROWS):
+    with gzip.GzipFile(fileobj=target, mode="wb", mtime=0) as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        for i, chunk in enumerate(_chunks(df, chunk_rows)):
+            chunk.to_csv(text, index=False, header=i == 0)
+        text.flush()
+        text.detach()
+
+def _arrow_tables(df, chunk_rows):
+    schema = None
+    for chunk in _chunks(df, chunk_rows):
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        schema = table.schema
+        yield table
+
+def write_parquet(df, target, chunk_rows=CHUNK_ROWS):
+    writer = None
+    for table in _arrow_tables(df, chunk_rows):
+        if writer is None:
+            writer = pq.ParquetWriter(target, table.schema, compression="zstd")
+        writer.write_table(table)
+    writer.close()
+
+def write_arrow(df, target, chunk_rows=CHUNK_ROWS):
+    writer = None
+    for table in _arrow_tables(df, chunk_rows):
+        if writer is None:
+            writer = ipc.new_file(target, table.schema)
+        writer.write_table(table)
+    writer.close()
+
+WRITERS = {"csv.gz": write_csv_gz, "parquet": write_parquet, "arrow": write_arrow}
+
+@timed("export")
+def write_export(df, extension, target, chunk_rows=CHUNK_ROWS):
+    WRITERS[extension](df, target, chunk_rows)
+
+def export_frame(df, label, chunk_rows=CHUNK_ROWS):
+    # Serialized bytes for one of EXPORT_FORMATS, ready for st.download_button
+    buffer = io.BytesIO()
+    write_export(df, EXPORT_FORMATS[label]["extension"], buffer, chunk_rows)
+    return buffer.getvalue()
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+import pandas as pd
+
+# Cached gaps up to this many days between two missing ranges are refetched
+# rather than paying for another round trip
+MAX_GAP_DAYS = 7
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_intervals(start, end, intervals):
+    # Parts of [start, end] not covered by any of the (sorted, merged) intervals
+    missing = []
+    cursor = start
+    for covered_start, covered_end in intervals:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start - timedelta(days=1)))
+        cursor = covered_end + timedelta(days=1)
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+def plan_fetches(coverage, start, end, variables, max_gap_days=MAX_GAP_DAYS):
+    # Returns (start, end, variables) requests covering every missing (variable, day)
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+
+    missing = {
+        variable: subtract_intervals(start, end, merge_intervals(coverage.get(variable, [])))
+        for variable in variables
+    }
+
+    # Cut the range wherever some variable's missing interval starts or stops
+    bounds = {start, end + timedelta(days=1)}
+    for intervals in missing.values():
+        for s, e in intervals:
+            bounds.update((s, e + timedelta(days=1)))
+    bounds = sorted(bounds)
+
+    segments = []
+    for seg_start, seg_next in zip(bounds, bounds[1:]):
+        seg_end = seg_next - timedelta(days=1)
+        needed = [v for v in variables
+                  if any(s <= seg_start and seg_end <= e for s, e in missing[v])]
+        if not needed:
+            continue
+        if segments:
+            prev_start, prev_end, prev_vars = segments[-1]
+            gap = (seg_start - prev_end).days - 1
+            if gap <= max_gap_days:
+                merged_vars = [v for v in variables if v in prev_vars or v in needed]
+                segments[-1] = (prev_start, seg_end, merged_vars)
+                continue
+        segments.append((seg_start, seg_end, needed))
+    return segments
+
+def merge_frames(frames):
+    # Earlier frames win where several provide the same (time, variable)
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    frames = [df.set_index("time") for df in frames]
+    merged = frames[0]
+    for df in frames[1:]:
+        merged = merged.combine_first(df)
+    return merged.sort_index().reset_index()
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils import metrics
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, bytes):
+        return len(value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_size_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size_of(v) for v in value)
+    return 0
+
+class FrameCache:
+    # Parsed frames (or dicts of frames) kept in memory, evicting least recently used past max_bytes
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.increment("frame_cache_requests_total", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        size = _size_of(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            # The newest entry is always kept, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_load(self, key, load):
+        value = self.get(key)
+        if value is None:
+            value = load()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        # Hits and misses are counted in utils.metrics (frame_cache_requests_total)
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,213 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+from utils.config import GEOCODING_URL, NOMINATIM_URL, POSTCODES_URL
+from utils import metrics
+from utils.http_session import http_get
+
+CACHE_PATH = ".geocode_cache.sqlite"
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Optional bundled place list (name, latitude, longitude and optionally population)
+GAZETTEER_PATH = os.path.join("data", "gazetteer.csv")
+
+MIN_QUERY_LENGTH = 3
+MAX_RESULTS = 8
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_index_lock = threading.Lock()
+_index = None
+
+def normalize(text):
+    # Case-, accent- and whitespace-insensitive form used for cache keys and the prefix index
+    text = unicodedata.normalize("NFKD", str(text)).casefold()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.replace(",", " ").split())
+
+def _create_schema(connection):
+    # WAL mode is stored in the database file, so this only has to run once per process
+    connection.execute("PRAGMA journal_mode=WAL")
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(provider TEXT, query TEXT, body TEXT, fetched_at REAL, PRIMARY KEY (provider, query))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS places "
+            "(name TEXT PRIMARY KEY, latitude REAL, longitude REAL, rank REAL)"
+        )
+
+def _connection():
+    # One connection per thread, opened on first use; SQLite serializes the writers
+    global _schema_ready
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(CACHE_PATH, timeout=10)
+        with _schema_lock:
+            if not _schema_ready:
+                _create_schema(connection)
+                _schema_ready = True
+        _local.connection = connection
+    return connection
+
+def _cached_json(provider, query, fetch):
+    # Disk-cached JSON lookup; failed requests and non-JSON bodies return None and are not cached
+    row = _connection().execute(
+        "SELECT body, fetched_at FROM responses WHERE provider = ? AND query = ?", (provider, query)
+    ).fetchone()
+    if row is not None and time.time() - row[1] < CACHE_TTL_SECONDS:
+        metrics.increment("geocode_cache_requests_total", provider=provider, result="hit")
+        return json.loads(row[0])
+    metrics.increment("geocode_cache_requests_total", provider=provider, result="miss")
+
+    try:
+        res = fetch()
+        if res.status_code != 200:
+            return None
+        body = res.json()
+    except Exception:
+        return None
+
+    connection = _connection()
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            (provider, query, json.dumps(body), time.time())
+        )
+    return body
+
+class PlaceIndex:
+    # Sorted (key, name) pairs searched by prefix with bisect; every word of a name's first
+    # part starts its own key, so "york" finds "New York"
+    def __init__(self):
+        self._keys = []
+        self._places = {}
+
+    def __len__(self):
+        return len(self._places)
+
+    def __contains__(self, name):
+        return name in self._places
+
+    def add(self, name, latitude, longitude, rank=0.0):
+        if name in self._places:
+            return
+        self._places[name] = (float(latitude), float(longitude), float(rank))
+        normalized = normalize(name)
+        first_part = normalize(name.split(",")[0])
+        words = first_part.split()
+        keys = {normalized} | {" ".join(words[i:]) for i in range(1, len(words))}
+        for key in keys:
+            insort(self._keys, (key, name))
+
+    def search(self, query, limit=MAX_RESULTS):
+        prefix = normalize(query)
+        start = bisect_left(self._keys, (prefix,))
+        end = bisect_left(self._keys, (prefix + "\uffff",))
+        names = {name for _, name in self._keys[start:end]}
+        best = nlargest(limit, names, key=lambda name: self._places[name][2])
+        return [{"name": name, "latitude": self._places[name][0], "longitude": self._places[name][1]}
+                for name in best]
+
+def _load_index():
+    index = PlaceIndex()
+    if os.path.exists(GAZETTEER_PATH):
+        with open(GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                index.add(row["name"], row["latitude"], row["longitude"], float(row.get("population") or 0))
+
+    rows = _connection().execute("SELECT name, latitude, longitude, rank FROM places").fetchall()
+    for row in rows:
+        index.add(*row)
+    return index
+
+def get_place_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = _load_index()
+        return _index
+
+def _remember_places(places):
+    index = get_place_index()
+    with _index_lock:
+        places = [place for place in places if place["name"] not in index]
+        for place in places:
+            index.add(place["name"], place["latitude"], place["longitude"], place["rank"])
+    if not places:
+        return
+
+    connection = _connection()
+    with connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO places VALUES (?, ?, ?, ?)",
+            [(p["name"], p["latitude"], p["longitude"], p["rank"]) for p in places]
+        )
+
+def search_places(query, limit=MAX_RESULTS):
+    # Answered from the local index when it has enough matches; otherwise Nominatim is asked
+    # once per distinct query and its results join the index
+    if not query or len(query.strip()) < MIN_QUERY_LENGTH:
+        return []
+
+    index = get_place_index()
+    with _index_lock:
+        local = index.search(query, limit)
+    if len(local) >= limit:
+        metrics.increment("place_search_total", source="local")
+        return local
+    metrics.increment("place_search_total", source="remote")
+
+    key = normalize(query)
+    body = _cached_json("nominatim", key, lambda: http_get(
+        f"{NOMINATIM_URL}/search", params={"format": "json", "q": query}, timeout=5
+    ))
+    if not body:
+        return local
+
+    remote = [
+        {"name": item["display_name"], "latitude": float(item["lat"]), "longitude": float(item["lon"]),
+         "rank": float(item.get("importance") or 0)}
+        for item in body[:limit]
+    ]
+    _remember_places(remote)
+
+    results = [{k: place[k] for k in ("name", "latitude", "longitude")} for place in remote]
+    seen = {place["name"] for place in results}
+    results += [place for place in local if place["name"] not in seen]
+    return results[:limit]
+
+def reverse_geocode(lat, lon):
+    # Display name for a coordinate (cached at ~10 m resolution), or None
+    key = f"{lat:.4f},{lon:.4f}"
+    body = _cached_json("nominatim_reverse", key, lambda: http_get(
+        f"{NOMINATIM_URL}/reverse", params={"format": "json", "lat": lat, "lon": lon}, timeout=5
+    ))
+    return body.get("display_name") if body else None
+
+def geocode_city(name):
+    # Best Open-Meteo match as a dict, {} when nothing matches, None if the lookup failed
+    body = _cached_json("open_meteo", normalize(name), lambda: http_get(
+        GEOCODING_URL, params={"name": name, "count": 1}
+    ))
+    if body is None:
+        return None
+    results = body.get("results") or []
+    return results[0] if results else {}
+
+def geocode_postcode(postcode):
+    # postcodes.io result dict for a UK postcode, or None if it is invalid or the lookup failed
+    key = "".join(postcode.split()).upper()
+    body = _cached_json("postcodes", key, lambda: http_get(f"{POSTCODES_URL}/{key}"))
+    if body is None or body.get("status") != 200:
+        return None
+    return body["result"]
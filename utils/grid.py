@@ -0,0 +1,17 @@
+# Coordinates are snapped to a 0.1 degree lattice before fetching, so nearby requests ("London"
+# from search and 51.5074, -0.1278 typed by hand) share one store entry and cache key. Open-Meteo
+# would otherwise downscale temperatures to the elevation of each exact coordinate, so snapped
+# requests send GRID_ELEVATION: the model grid cell's own elevation is used, and the data is the
+# same for every point that snaps together. It describes the grid point, up to ~5 km away, not the
+# exact location, which is why the pages show both.
+GRID_STEP = 0.1
+GRID_ELEVATION = "nan"
+
+def snap_to_grid(lat, lon, step=GRID_STEP):
+    lat = min(max(float(lat), -90.0), 90.0)
+    lon = (float(lon) + 180.0) % 360.0 - 180.0
+    snapped_lat = round(round(lat / step) * step, 4)
+    snapped_lon = round(round(lon / step) * step, 4)
+    if snapped_lon >= 180.0:
+        snapped_lon -= 360.0
+    return snapped_lat + 0.0, snapped_lon + 0.0
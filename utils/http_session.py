@@ -0,0 +1,85 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import metrics
+from utils.config import ARCHIVE_URL, FORECAST_URL, GEOCODING_URL, NOMINATIM_URL
+from utils.rate_limit import RateLimitedAdapter, nominatim_limiter, openmeteo_limiter
+
+DEFAULT_TIMEOUT = 10
+USER_AGENT = "weather-archive-app/1.0"
+
+# Connections kept open per host; requests beyond this wait for a free connection
+MAX_CONNECTIONS_PER_HOST = 8
+URL_CONNECTION_LIMITS = {
+    # Nominatim's usage policy allows a single concurrent client
+    NOMINATIM_URL: 1,
+}
+# Requests per second are limited per upstream call, shared across every thread and session
+URL_RATE_LIMITERS = {
+    FORECAST_URL: openmeteo_limiter,
+    ARCHIVE_URL: openmeteo_limiter,
+    GEOCODING_URL: openmeteo_limiter,
+    NOMINATIM_URL: nominatim_limiter,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _make_adapter(max_connections, limiter=None):
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    options = {"pool_connections": 16, "pool_maxsize": max_connections, "pool_block": True, "max_retries": retries}
+    if limiter is not None:
+        return RateLimitedAdapter(limiter, **options)
+    return HTTPAdapter(**options)
+
+def get_http_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers["User-Agent"] = USER_AGENT
+                session.mount("https://", _make_adapter(MAX_CONNECTIONS_PER_HOST))
+                session.mount("http://", _make_adapter(MAX_CONNECTIONS_PER_HOST))
+                for prefix in {**URL_CONNECTION_LIMITS, **URL_RATE_LIMITERS}:
+                    limit = URL_CONNECTION_LIMITS.get(prefix, MAX_CONNECTIONS_PER_HOST)
+                    session.mount(prefix, _make_adapter(limit, URL_RATE_LIMITERS.get(prefix)))
+                _session = session
+    return _session
+
+def _record(host, seconds, failed):
+    metrics.observe("http_request_seconds", seconds, host=host)
+    metrics.increment("http_requests_total", host=host, outcome="error" if failed else "ok")
+
+def http_get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT):
+    host = urlsplit(url).netloc
+    started = time.perf_counter()
+    failed = True
+    try:
+        res = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+        failed = res.status_code >= 400
+        return res
+    finally:
+        _record(host, time.perf_counter() - started, failed)
+
+def get_request_stats():
+    # Per-host totals, read back from the http_request_seconds histograms
+    return {
+        histogram["labels"]["host"]: {
+            "requests": histogram["count"],
+            "errors": metrics.counter_value("http_requests_total", host=histogram["labels"]["host"], outcome="error"),
+            "total_seconds": histogram["sum"],
+        }
+        for histogram in metrics.snapshot()["histograms"] if histogram["name"] == "http_request_seconds"
+    }
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stage latencies are kept as Prometheus-style histograms (seconds) and counters, process-wide.
+# Set METRICS_PORT to serve them at /metrics (text) and /metrics.json, and METRICS_LOG to append
+# one JSON line per page rerun with its spans.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+PREFIX = "weather"
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_LOG = os.environ.get("METRICS_LOG")
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+# The current page trace lives in context variables, so work handed to another thread with
+# contextvars.copy_context().run (SingleFlight leaders, fetch pools) still records into it
+_trace = ContextVar("metrics_trace", default=None)
+_depth = ContextVar("metrics_depth", default=0)
+_server = None
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+def increment(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def counter_value(name, **labels):
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+@contextmanager
+def span(stage, **labels):
+    # Times one stage into stage_seconds{stage=...} and the current page trace, if any
+    trace = _trace.get()
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _depth.reset(token)
+        observe("stage_seconds", seconds, stage=stage, **labels)
+        if trace is not None:
+            trace["spans"].append({"stage": stage, "seconds": round(seconds, 6), "depth": depth, **labels})
+
+def timed(stage):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def begin_page(page):
+    # Start of a Streamlit rerun; spans from this thread, and from threads it hands its context
+    # to, are collected until end_page()
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    _trace.set({"page": page, "started": time.perf_counter(), "spans": []})
+    _depth.set(0)
+
+def end_page():
+    trace = _trace.get()
+    if trace is None:
+        return None
+    _trace.set(None)
+    seconds = time.perf_counter() - trace["started"]
+    observe("page_seconds", seconds, page=trace["page"])
+    record = {"time": time.time(), "page": trace["page"], "seconds": round(seconds, 6),
+              "spans": list(trace["spans"])}
+    if METRICS_LOG:
+        with _lock, open(METRICS_LOG, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    return record
+
+def _escape(value):
+    # Label values in the text format escape backslash, double quote and newline
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def prometheus_text():
+    with _lock:
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                      for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}_{name} histogram")
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}_{name}_bucket{_labels_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{PREFIX}_{name}_sum{_labels_text(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{PREFIX}_{name}_count{_labels_text(labels)} {histogram['count']}")
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}_{name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{PREFIX}_{name}{_labels_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    # The same data as prometheus_text(), as plain dicts for JSON logs
+    with _lock:
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), "sum": h["sum"], "count": h["count"],
+                            "buckets": dict(zip(map(str, BUCKETS), h["buckets"]))}
+                           for (name, labels), h in sorted(_histograms.items())],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(_counters.items())],
+        }
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host="127.0.0.1"):
+    # Serves /metrics and /metrics.json from a daemon thread; only the first call starts it
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Another process (e.g. a second app instance) already serves this port
+            print(f"Metrics server not started on port {port}: {e}")
+            _server = False
+            return None
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -1,32 +1,37 @@
+import numpy as np
 import pandas as pd
 
-def parse_hourly_response(response):
+from utils.metrics import timed
+
+# WMO weather codes are small integers, so they fit in a byte when nothing is missing
+CODE_VARIABLES = {"weather_code"}
+
+@timed("parse_hourly")
+def parse_hourly_response(response, variables, dtype=np.float32, compact_codes=True):
+    # Columns are read-only views onto the response buffer, with no copy. Assigning into the
+    # frame raises, and the frame keeps the whole response alive, including any variables that
+    # weren't selected. copy() it to modify or keep it. `variables` must match the request order.
     try:
         hourly = response.Hourly()
+        if hourly.VariablesLength() != len(variables):
+            raise ValueError(f"expected {len(variables)} variables, got {hourly.VariablesLength()}")
+
         time_range = pd.date_range(
             start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
             end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
             freq=pd.Timedelta(seconds=hourly.Interval()), inclusive="left"
         )
 
-        variable_names = [
-            "temperature_2m", "wind_speed_100m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature",
-            "rain", "precipitation", "snowfall", "snow_depth",
-            "soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm",
-            "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm",
-            "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm",
-            "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm",
-            "weather_code", "pressure_msl", "surface_pressure", "cloud_cover",
-            "cloud_cover_low", "cloud_cover_mid", "cloud_cover_high",
-            "et0_fao_evapotranspiration", "vapour_pressure_deficit", "wind_speed_10m",
-            "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m"
-        ]
-
         hourly_data = {"time": time_range}
-        for i, name in enumerate(variable_names):
-            hourly_data[name] = hourly.Variables(i).ValuesAsNumpy()
+        for i, name in enumerate(variables):
+            values = hourly.Variables(i).ValuesAsNumpy()
+            if compact_codes and name in CODE_VARIABLES and not np.isnan(values).any():
+                values = values.astype(np.uint8)
+            elif values.dtype != dtype:
+                values = values.astype(dtype)
+            hourly_data[name] = values
 
-        return pd.DataFrame(hourly_data)
+        return pd.DataFrame(hourly_data, copy=False)
     except Exception as e:
         print("Parsing error:", e)
         return None
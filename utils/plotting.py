@@ -1,4 +1,7 @@
-import plotly.express as px
+from utils.downsampling import downsample, MAX_POINTS
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")
 
 def get_parameter_color(param):
     color_map = {
@@ -11,8 +14,9 @@ def get_parameter_color(param):
     }
     return color_map.get(param, "gray")
 
-def plot_chart(df, x, y, title, chart_type="line"):
+def plot_chart(df, x, y, title, chart_type="line", max_points=MAX_POINTS):
     color = get_parameter_color(y)
+    df = downsample(df, x, [y], max_points, method="lttb" if chart_type == "line" else "minmax")
     if chart_type == "line":
         return px.line(df, x=x, y=y, title=title, color_discrete_sequence=[color])
     return px.scatter(df, x=x, y=y, title=title, color_discrete_sequence=[color])
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+
+# Open-Meteo's free tier allows 600 calls a minute per client, across all of its APIs
+OPENMETEO_REQUESTS_PER_SECOND = float(os.environ.get("OPENMETEO_REQUESTS_PER_SECOND", 10))
+# Nominatim's usage policy allows one request a second
+NOMINATIM_REQUESTS_PER_SECOND = 1.0
+
+class RateLimiter:
+    # Token bucket shared by every thread; wait() blocks until the next request may go out
+    def __init__(self, requests_per_second, burst=1):
+        self._lock = threading.Lock()
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.set_rate(requests_per_second)
+
+    def set_rate(self, requests_per_second):
+        with self._lock:
+            self._rate = float(requests_per_second or 0)
+
+    def wait(self):
+        while True:
+            with self._lock:
+                if not self._rate:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self._rate
+            time.sleep(delay)
+
+class RateLimitedAdapter(HTTPAdapter):
+    # Only requests that reach the network pass through an adapter, so HTTP cache hits are free
+    def __init__(self, limiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.limiter.wait()
+        return super().send(request, **kwargs)
+
+openmeteo_limiter = RateLimiter(OPENMETEO_REQUESTS_PER_SECOND)
+nominatim_limiter = RateLimiter(NOMINATIM_REQUESTS_PER_SECOND)
@@ -0,0 +1,51 @@
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+from utils.metrics import timed
+
+# Resolutions offered by the pages, finest first so each can be built from the one before
+HOURLY_ROLLUPS = {"3-Hour": "3h", "6-Hour": "6h", "12-Hour": "12h", "Daily": "D"}
+DAILY_ROLLUPS = {"Weekly": "W-MON", "Monthly": "MS"}
+
+AGGREGATIONS = ("mean", "min", "max", "sum")
+
+def _nests(finer, coarser):
+    finer, coarser = to_offset(finer), to_offset(coarser)
+    return isinstance(finer, Tick) and isinstance(coarser, Tick) and coarser.nanos % finer.nanos == 0
+
+def _combine(partials, freq):
+    # Bins are closed and labelled on the left, so weeks run Monday to Sunday under their Monday
+    def resample(frame):
+        return frame.resample(freq, closed="left", label="left")
+
+    return {
+        "sum": resample(partials["sum"]).sum(min_count=1),
+        "count": resample(partials["count"]).sum(),
+        "min": resample(partials["min"]).min(),
+        "max": resample(partials["max"]).max(),
+    }
+
+@timed("rollups")
+def compute_rollups(df, freqs, aggs=AGGREGATIONS):
+    # Returns {freq: {agg: frame with a "time" column}} for every numeric column of df.
+    # Each level keeps sum/count/min/max partials, so coarser levels are built from finer ones
+    # instead of rescanning the base frame.
+    base = df.set_index("time").select_dtypes("number")
+    base_partials = {"sum": base, "count": base.notna(), "min": base, "max": base}
+
+    levels = {}
+    rollups = {}
+    for freq in freqs:
+        source = next((levels[f] for f in reversed(list(levels)) if _nests(f, freq)), base_partials)
+        partials = _combine(source, freq)
+        levels[freq] = partials
+
+        frames = {
+            "mean": partials["sum"] / partials["count"].replace(0, np.nan),
+            "min": partials["min"],
+            "max": partials["max"],
+            "sum": partials["sum"],
+        }
+        rollups[freq] = {agg: frames[agg].reset_index() for agg in aggs}
+    return rollups
@@ -0,0 +1,93 @@
+import contextvars
+import threading
+
+from utils import metrics
+
+class _Call:
+    def __init__(self):
+        self.changed = threading.Condition()
+        self.finished = False
+        self.abandoned = False
+        self.result = None
+        self.error = None
+        self.progress = None
+
+    def report(self, fraction, text):
+        with self.changed:
+            self.progress = (fraction, text)
+            self.changed.notify_all()
+
+    def finish(self, result, error, abandoned):
+        with self.changed:
+            self.result, self.error, self.abandoned = result, error, abandoned
+            self.finished = True
+            self.changed.notify_all()
+
+class SingleFlight:
+    # Concurrent calls with the same key wait for the first one and share its result.
+    # The shared object is handed to every caller, so results must be treated as read-only.
+    # fn(report) runs once per key at a time; report(fraction, text) reaches every waiting
+    # caller's progress callback, always on that caller's own thread, so a callback that raises
+    # (e.g. Streamlit's rerun/stop exceptions) only ends that caller's wait, never the shared call.
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, progress=None):
+        while True:
+            with self._lock:
+                call = self._in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._in_flight[key] = call
+            metrics.increment("single_flight_total", result="leader" if leader else "shared")
+
+            if leader and progress is None:
+                self._run(key, call, fn)
+            elif leader:
+                # The leader's thread runs in the caller's context, so its metrics spans land in
+                # the caller's page trace
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(self._run, key, call, fn), daemon=True).start()
+            self._wait(call, progress)
+
+            # A leader stopped by something other than an error: the next caller runs it again
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _run(self, key, call, fn):
+        result = error = None
+        abandoned = False
+        try:
+            result = fn(call.report)
+        except Exception as e:
+            error = e
+        except BaseException:
+            abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.finish(result, error, abandoned)
+
+    @staticmethod
+    def _wait(call, progress):
+        reported = None
+        while True:
+            with call.changed:
+                while not call.finished and call.progress is reported:
+                    call.changed.wait()
+                update, finished = call.progress, call.finished
+            if progress is not None and update is not reported:
+                progress(*update)
+            reported = update
+            if finished:
+                return
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
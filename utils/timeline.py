@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from utils.data_fetching import get_archive_daily, get_forecast_daily, DAILY_VARIABLES
+from utils.fetch_planner import merge_frames
+from utils.grid import snap_to_grid
+
+FORECAST_DAYS = 7
+
+# The forecast endpoint also serves recent past days, which covers the archive's lag
+FORECAST_PAST_DAYS = 5
+
+# Forecast models run every 6 hours (00, 06, 12, 18 UTC) and take a few hours to publish,
+# so a cached forecast stays valid until the next run is out
+MODEL_RUN_HOURS = 6
+MODEL_PUBLISH_DELAY = timedelta(hours=3)
+
+_forecast_cache = {}
+_forecast_lock = threading.Lock()
+
+def forecast_cycle(now=None):
+    # Start of the newest model run that should already be published
+    now = (now or datetime.now(timezone.utc)) - MODEL_PUBLISH_DELAY
+    return now.replace(hour=now.hour - now.hour % MODEL_RUN_HOURS, minute=0, second=0, microsecond=0)
+
+def _cached_forecast(lat, lon, start, end):
+    key = (lat, lon, start, end)
+    cycle = forecast_cycle()
+    with _forecast_lock:
+        entry = _forecast_cache.get(key)
+        if entry is not None and entry[0] == cycle:
+            return entry[1]
+
+    df = get_forecast_daily(lat, lon, start, end)
+    if df is not None:
+        with _forecast_lock:
+            # Forecasts from older runs are never read again
+            for old_key in [k for k, (c, _) in _forecast_cache.items() if c != cycle]:
+                del _forecast_cache[old_key]
+            _forecast_cache[key] = (cycle, df)
+    return df
+
+def _last_observed_day(df):
+    observed = df[DAILY_VARIABLES[0]].notna() if DAILY_VARIABLES[0] in df.columns else df["time"].notna()
+    return df.loc[observed, "time"].max() if observed.any() else None
+
+def get_daily_timeline(lat, lon, start, end, forecast_days=FORECAST_DAYS, progress=None):
+    # Archive days up to yesterday followed by forecast days, fetched in parallel. The archive
+    # wins where both have a value. Returns (df, first forecast day or None), or None without data
+    lat, lon = snap_to_grid(lat, lon)
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    today = date.today()
+    end = min(end, today + timedelta(days=forecast_days))
+
+    archive_end = min(end, today - timedelta(days=1))
+    forecast_start = max(start, today - timedelta(days=FORECAST_PAST_DAYS))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        forecast = pool.submit(_cached_forecast, lat, lon, forecast_start, end) if forecast_start <= end else None
+        archive = get_archive_daily(lat, lon, start, archive_end, progress=progress) if start <= archive_end else None
+        forecast = forecast.result() if forecast is not None else None
+
+    df = merge_frames([archive, forecast])
+    if df is None:
+        return None
+
+    columns = ["time"] + [v for v in DAILY_VARIABLES if v in df.columns]
+    df = df[columns]
+
+    last_observed = _last_observed_day(archive) if archive is not None else None
+    if forecast is None or forecast.empty:
+        return df, None
+    first_forecast = forecast["time"].min() if last_observed is None else last_observed + pd.Timedelta(days=1)
+    return df, first_forecast if first_forecast <= df["time"].max() else None
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from utils.metrics import timed
+
+TREND_METHODS = ["Linear", "Rolling Mean", "LOESS"]
+
+def epoch_seconds(times):
+    # Seconds since 1970 as float64, read straight from the int64 datetime storage
+    times = pd.Series(times)
+    if pd.api.types.is_datetime64_any_dtype(times):
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(None)
+        return times.to_numpy(dtype="datetime64[ns]").view(np.int64) / 1e9
+    return times.to_numpy(dtype=np.float64)
+
+def linear_trends(x, values):
+    # Least-squares line for every column of `values` (n, k) at once, ignoring NaNs per column.
+    # Returns the fitted values at each x as an (n, k) array.
+    values = np.asarray(values, dtype=np.float64)
+    mask = ~np.isnan(values)
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(mask, x[:, None], 0.0).sum(axis=0) / counts
+        y_mean = np.where(mask, values, 0.0).sum(axis=0) / counts
+        dx = np.where(mask, x[:, None] - x_mean, 0.0)
+        slope = (dx * np.where(mask, values, 0.0)).sum(axis=0) / (dx * dx).sum(axis=0)
+    fitted = y_mean + slope * (x[:, None] - x_mean)
+    fitted[:, counts < 2] = np.nan
+    return fitted
+
+def loess_trends(x, values, frac=0.3, n_anchors=60, max_bins=2000):
+    # LOESS-style smoothing: the series is reduced to at most max_bins bin means, a tricube-weighted
+    # line is fitted around n_anchors evenly spaced points, and the result is interpolated back to x.
+    values = np.asarray(values, dtype=np.float64)
+    span = x[-1] - x[0]
+    if len(x) < 3 or span <= 0:
+        return linear_trends(x, values)
+
+    position = (x - x[0]) / span
+    bins = np.minimum((position * max_bins).astype(np.int64), max_bins - 1)
+    anchors = np.linspace(0.0, 1.0, n_anchors)
+    weights = np.clip(1 - (np.abs(anchors[:, None] - (np.arange(max_bins) + 0.5) / max_bins) / frac) ** 3, 0, None) ** 3
+
+    fitted = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        valid = ~np.isnan(values[:, j])
+        counts = np.bincount(bins[valid], minlength=max_bins)
+        sums = np.bincount(bins[valid], weights=values[valid, j], minlength=max_bins)
+        centres = np.bincount(bins[valid], weights=position[valid], minlength=max_bins)
+        filled = counts > 0
+        if filled.sum() < 2:
+            continue
+        bx = centres[filled] / counts[filled]
+        by = sums[filled] / counts[filled]
+        w = weights[:, filled]
+
+        sw, swx, swy = w.sum(1), w @ bx, w @ by
+        swxx, swxy = w @ (bx * bx), w @ (bx * by)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = (sw * swxy - swx * swy) / (sw * swxx - swx * swx)
+            at_anchor = (swy - slope * swx) / sw + slope * anchors
+        ok = np.isfinite(at_anchor)
+        if ok.sum() >= 2:
+            fitted[:, j] = np.interp(position, anchors[ok], at_anchor[ok])
+    return fitted
+
+@timed("trends")
+def fit_trends(df, columns, method="Linear", x="time", window=None, frac=0.3):
+    # Trend of each of `columns`, returned as a frame aligned with df's rows
+    if method == "Rolling Mean":
+        window = window or max(3, len(df) // 30)
+        return df[columns].rolling(window, center=True, min_periods=1).mean()
+
+    x_values = epoch_seconds(df[x])
+    if method == "LOESS":
+        fitted = loess_trends(x_values, df[columns].to_numpy(dtype=np.float64), frac=frac)
+    else:
+        fitted = linear_trends(x_values, df[columns].to_numpy(dtype=np.float64))
+    return pd.DataFrame(fitted, index=df.index, columns=columns)